@@ -319,7 +319,7 @@ class TestEveningOptimization(unittest.TestCase):
             schedule_manager.schedule_data_manager = mock_sdm
             
             # Make the mock return the input data unmodified for create_register_data
-            mock_sdm.create_register_data.side_effect = lambda periods: [len(periods)] + [0] * 42
+            mock_sdm.create_register_data.side_effect = lambda periods, assume_sorted=False: [len(periods)] + [0] * 42
             
             # Test evening update
             result = schedule_manager.update_evening_schedule()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path so we can import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STOCKHOLM_TZ
+from battery_manager import BatteryManager
+from high_usage_monitor import BatteryModeManager
+from period_manager import PeriodManager
+
+class TestBatteryModeManager(unittest.TestCase):
+
+    def setUp(self):
+        """Set up common test fixtures."""
+        self.period_manager = PeriodManager()
+        self.monday_bit = 1 << 1  # Monday = bit 1
+
+        # Mock the battery manager
+        self.mock_battery = MagicMock(spec=BatteryManager)
+        self.mock_battery.schedule_version = 0
+
+        # Patch datetime so the current day is a Monday
+        self.datetime_patcher = patch('high_usage_monitor.datetime')
+        self.mock_datetime = self.datetime_patcher.start()
+        self.addCleanup(self.datetime_patcher.stop)
+
+    def is_discharging_at(self, periods, hour, minute=0):
+        """Check is_currently_discharging for a schedule at a Monday time of day."""
+        self.mock_battery.read_schedule.return_value = {'num_periods': len(periods), 'periods': periods}
+        self.mock_datetime.now.return_value = datetime(2023, 5, 15, hour, minute, tzinfo=STOCKHOLM_TZ)
+        return BatteryModeManager(self.mock_battery).is_currently_discharging()
+
+    def test_is_currently_discharging(self):
+        """Test detecting an active discharging period."""
+        periods = [
+            self.period_manager.create_period(10, 12, False, self.monday_bit),
+            self.period_manager.create_period(13, 14, True, self.monday_bit),
+        ]
+
+        self.assertTrue(self.is_discharging_at(periods, 11, 30))
+        self.assertFalse(self.is_discharging_at(periods, 12, 30))
+        self.assertFalse(self.is_discharging_at(periods, 13, 30))  # Charging
+        self.assertFalse(self.is_discharging_at(periods, 9))
+
+        # Periods for another day don't count
+        tuesday_period = self.period_manager.create_period(10, 12, False, 1 << 2)
+        self.assertFalse(self.is_discharging_at([tuesday_period], 11))
+
+    def test_is_currently_discharging_overlapping_periods(self):
+        """Test a discharging period covering now when a later-starting period overlaps it."""
+        periods = [
+            self.period_manager.create_period(10, 16, False, self.monday_bit),
+            self.period_manager.create_period(11, 12, True, self.monday_bit),
+            self.period_manager.create_period(12, 13, True, self.monday_bit),
+        ]
+
+        self.assertTrue(self.is_discharging_at(periods, 11, 30))
+        self.assertTrue(self.is_discharging_at(periods, 13, 30))
+        self.assertFalse(self.is_discharging_at(periods, 16, 30))
+
+    def test_is_currently_discharging_midnight_crossing(self):
+        """Test a discharging period that runs past midnight."""
+        periods = [self.period_manager.create_period(22, 2, False, self.monday_bit)]
+
+        self.assertTrue(self.is_discharging_at(periods, 23))
+        self.assertFalse(self.is_discharging_at(periods, 21))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,6 @@
 import unittest
 from unittest.mock import patch
 from datetime import datetime
-import pandas as pd
 import sys
 import os
 
@@ -61,6 +60,12 @@ class TestOptimizationManager(unittest.TestCase):
         
         # Check that prices are sorted from lowest to highest
         self.assertEqual(night_prices, sorted(night_prices, key=lambda x: x['SEK_per_kWh']))
+        
+        # A limit keeps only the cheapest prices, in the same order
+        self.assertEqual(
+            self.manager.get_night_prices(self.today_prices, self.tomorrow_prices, limit=3),
+            night_prices[:3]
+        )
     
     def test_process_charging_periods(self):
         """Test creating charging periods for night hours."""
@@ -75,11 +80,50 @@ class TestOptimizationManager(unittest.TestCase):
         for period in charging_periods:
             self.assertTrue(period['is_charging'])
     
+    def test_create_hour_period(self):
+        """Test the one-hour period fast path matches create_period."""
+        for hour in range(24):
+            self.assertEqual(
+                self.period_manager.create_hour_period(hour, is_charging=False, day_bit=self.monday_bit),
+                self.period_manager.create_period(hour, (hour + 1) % 24, False, self.monday_bit)
+            )
+    
+    def test_drop_overlapping_periods(self):
+        """Test overlapping periods are dropped only when they share a day."""
+        tuesday_bit = 1 << 2
+        first = self.period_manager.create_period(18, 20, False, self.monday_bit)
+        overlapping = self.period_manager.create_period(19, 21, False, self.monday_bit)
+        other_day = self.period_manager.create_period(19, 21, False, tuesday_bit)
+        adjacent = self.period_manager.create_period(20, 22, False, self.monday_bit | tuesday_bit)
+
+        result = self.period_manager.drop_overlapping_periods([adjacent, other_day, overlapping, first])
+
+        self.assertEqual(result, [first, other_day])
+
+    def test_check_overlap(self):
+        """Test overlap of adjacent, overlapping and midnight-crossing periods."""
+        create = self.period_manager.create_period
+        evening = create(18, 20, False, self.monday_bit)
+
+        # Adjacent periods only touch
+        self.assertFalse(self.period_manager.check_overlap(evening, create(20, 22, False, self.monday_bit)))
+        self.assertFalse(self.period_manager.check_overlap(create(16, 18, False, self.monday_bit), evening))
+
+        # Overlapping periods, in either order, but only on a shared day
+        self.assertTrue(self.period_manager.check_overlap(evening, create(19, 21, True, self.monday_bit)))
+        self.assertTrue(self.period_manager.check_overlap(create(19, 21, True, self.monday_bit), evening))
+        self.assertFalse(self.period_manager.check_overlap(evening, create(19, 21, True, 1 << 2)))
+
+        # Periods crossing midnight, including one ending exactly at midnight
+        night = create(22, 2, True, self.monday_bit)
+        self.assertTrue(self.period_manager.check_overlap(night, create(23, 0, False, self.monday_bit)))
+        self.assertTrue(self.period_manager.check_overlap(create(21, 23, False, self.monday_bit), night))
+        self.assertFalse(self.period_manager.check_overlap(create(20, 22, False, self.monday_bit), night))
+        self.assertFalse(self.period_manager.check_overlap(create(23, 0, False, self.monday_bit), evening))
+
     def test_process_discharging_periods(self):
         """Test creating discharging periods for daytime."""
-        df = pd.DataFrame(self.tomorrow_prices)
-        
-        discharging_periods = self.manager.process_discharging_periods(df, self.monday_bit)
+        discharging_periods = self.manager.process_discharging_periods(self.tomorrow_prices, self.monday_bit)
         
         # Should create up to max_discharging_periods periods
         self.assertLessEqual(len(discharging_periods), self.manager.max_discharging_periods)
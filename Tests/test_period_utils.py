@@ -0,0 +1,42 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from period_manager import PeriodManager
+from period_utils import collect_period_hours, collect_period_hours_mask, hour_mask
+
+class TestPeriodUtils(unittest.TestCase):
+
+    def setUp(self):
+        """Set up common test fixtures."""
+        self.period_manager = PeriodManager()
+
+    def expected_hours(self, start_hour, end_hour):
+        """Hours covered by a period, computed with the set-based approach."""
+        if end_hour <= start_hour:  # Midnight crossing
+            end_hour += 24
+        return {h % 24 for h in range(start_hour, end_hour)}
+
+    def test_collect_period_hours_mask(self):
+        """Test the hour bitmask against the set of hours for every whole-hour period."""
+        for start_hour in range(24):
+            for end_hour in range(24):
+                period = self.period_manager.create_period(start_hour, end_hour, False, 1)
+                mask = collect_period_hours_mask(period)
+                expected = self.expected_hours(start_hour, end_hour)
+
+                self.assertEqual({h for h in range(24) if mask >> h & 1}, expected)
+                self.assertEqual(collect_period_hours(period), expected)
+
+    def test_hour_mask(self):
+        """Test that hour_mask sets exactly the hours in [start_hour, end_hour)."""
+        for start_hour in range(25):
+            for end_hour in range(start_hour, 25):
+                mask = hour_mask(start_hour, end_hour)
+                self.assertEqual({h for h in range(24) if mask >> h & 1}, set(range(start_hour, end_hour)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+import json
+import tempfile
+import sys
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add the parent directory to the path so we can import the modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STOCKHOLM_TZ
+from price_fetcher import PriceFetcher
+
+class TestPriceFetcher(unittest.TestCase):
+
+    def setUp(self):
+        """Set up common test fixtures."""
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+        # Create a fixed datetime for testing
+        self.test_time = datetime(2023, 5, 15, 14, 0, 0, tzinfo=STOCKHOLM_TZ)
+
+        # Patch datetime so today and tomorrow are fixed
+        self.datetime_patcher = patch('price_fetcher.datetime', wraps=datetime)
+        self.mock_datetime = self.datetime_patcher.start()
+        self.mock_datetime.now.return_value = self.test_time
+        self.addCleanup(self.datetime_patcher.stop)
+
+    def make_response(self, url, timeout=None):
+        """Fake API response with one price per hour for the date in the URL."""
+        date = url.rsplit('/', 2)
+        day = f"{date[1]}-{date[2][:5]}"
+        response = MagicMock()
+        response.json.return_value = [
+            {'time_start': f"{day}T{h:02d}:00:00+02:00", 'SEK_per_kWh': 1.0 + h / 10}
+            for h in range(24)
+        ]
+        return response
+
+    def make_fetcher(self):
+        """Create a fetcher caching to the temporary directory, with the network mocked."""
+        fetcher = PriceFetcher(cache_dir=self.cache_dir.name)
+        fetcher.session.get = MagicMock(side_effect=self.make_response)
+        return fetcher
+
+    def test_get_prices(self):
+        """Test fetching and parsing today's and tomorrow's prices."""
+        fetcher = self.make_fetcher()
+        prices = fetcher.get_prices()
+
+        self.assertEqual([p['hour'] for p in prices['today']], list(range(24)))
+        self.assertEqual([p['hour'] for p in prices['tomorrow']], list(range(24)))
+        self.assertEqual(fetcher.session.get.call_count, 2)
+
+    def test_fetches_reuse_pooled_session(self):
+        """Test that both days are fetched through the instance's one pooled adapter."""
+        fetcher = PriceFetcher(cache_dir=None)
+        adapter = fetcher.session.get_adapter(fetcher.base_url)
+        self.assertGreaterEqual(adapter._pool_maxsize, 2)
+
+        used_adapters = []
+
+        def send(self_adapter, request, **kwargs):
+            used_adapters.append(self_adapter)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(self.make_response(request.url).json.return_value).encode()
+            return response
+
+        with patch.object(HTTPAdapter, 'send', autospec=True, side_effect=send):
+            fetcher.get_prices()
+
+        self.assertEqual(len(used_adapters), 2)
+        self.assertTrue(all(a is adapter for a in used_adapters))
+
+    def test_caches_are_per_instance(self):
+        """Test that in-memory caches are not shared between instances."""
+        fetcher = self.make_fetcher()
+        fetcher.get_prices()
+
+        other = PriceFetcher(cache_dir=None)
+        self.assertEqual(other._memory_cache, {})
+        self.assertEqual(other._processed_cache, {})
+
+    def test_disk_cache_reused(self):
+        """Test that a new instance reads cached days from disk instead of the network."""
+        self.make_fetcher().get_prices()
+
+        fetcher = self.make_fetcher()
+        prices = fetcher.get_prices()
+
+        self.assertIn('today', prices)
+        self.assertIn('tomorrow', prices)
+        fetcher.session.get.assert_not_called()
+
+    def test_old_cache_files_pruned(self):
+        """Test that writing the cache deletes files for days that are no longer needed."""
+        for name in ("2023-05-10_SE3.json", "2023-05-13_SE3.json", "2023-05-14_SE3.json", "notes.txt"):
+            with open(os.path.join(self.cache_dir.name, name), 'w') as f:
+                f.write("[]")
+
+        self.make_fetcher().get_prices()
+
+        self.assertEqual(
+            sorted(os.listdir(self.cache_dir.name)),
+            ["2023-05-14_SE3.json", "2023-05-15_SE3.json", "2023-05-16_SE3.json", "notes.txt"]
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -258,5 +258,20 @@ class TestScheduleManagerIntegration(unittest.TestCase):
         # There should be more than one period now (tomorrow's + evening periods)
         self.assertGreater(register_data[0], 1)
 
+    def test_unchanged_schedule_not_rewritten(self):
+        """Test that a schedule already held by the battery is not written again."""
+        scheduler = ScheduleManager("test_host")
+        self.assertTrue(scheduler.update_schedule())
+        args, _ = self.mock_battery.write_schedule.call_args
+        register_data = args[0]
+
+        # The battery now reports the image computed above
+        self.mock_battery.read_schedule.return_value = BatteryManager("test_host")._parse_schedule(list(register_data))
+        self.mock_battery.write_schedule.reset_mock()
+
+        scheduler = ScheduleManager("test_host")
+        self.assertTrue(scheduler.update_schedule())
+        self.mock_battery.write_schedule.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -9,6 +9,8 @@ class BatteryManager:
         self.port = port
         self.TOU_REGISTER = TOU_REGISTER
         self.MODE_REGISTER = MODE_REGISTER
+        # Bumped on every successful schedule write so readers can invalidate cached copies
+        self.schedule_version = 0
 
     def connect(self) -> Optional[ModbusTcpClient]:
         """Establish connection to the battery."""
@@ -246,6 +248,7 @@ class BatteryManager:
                 raise RuntimeError(error_msg)
 
             logger.info("Successfully wrote schedule to battery")
+            self.schedule_version += 1
             return True
 
         except Exception as e:
@@ -25,6 +25,7 @@ MAX_PERIODS = 14
 MAX_MINUTES = 1440
 STOCKHOLM_TZ = pytz.timezone('Europe/Stockholm')
 API_BASE_URL = "https://www.elprisetjustnu.se/api/v1/prices"
+PRICE_CACHE_DIR = os.getenv('PRICE_CACHE_DIR', os.path.expanduser('~/.cache/luna2000'))
 
 # Schedule configuration
 MAX_CHARGING_PERIODS = 3    # Maximum number of charging periods to select
@@ -42,6 +43,11 @@ NEXT_DAY_END_HOUR = 22   # End hour for next day price comparison (22:00)
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAY = 20  # seconds
+MAX_RETRY_DELAY = 300  # seconds - upper bound for exponential backoff
+BACKOFF_INITIAL = 5.0  # seconds - first retry waits a random delay up to this
+BACKOFF_MIN = 1.92     # seconds - base delay for subsequent retries
+BACKOFF_FACTOR = 1.618 # growth factor between retries
+MAX_CONNECTS_PER_HOUR = 15  # Tibber warns/blocks clients above 20 new connections per hour
 
 # High usage monitor configuration
 HIGH_USAGE_THRESHOLD = 8.0  # kW - switch to max self-consumption above this threshold
@@ -50,6 +56,9 @@ MAX_SELF_CONSUMPTION_DURATION = 600  # seconds (10 minutes) - how long to stay i
 MONITORING_START_HOUR = 7  # Only monitor between these hours
 MONITORING_END_HOUR = 22
 MIN_SOC_FOR_DISCHARGE = 10  # Minimum battery % to allow discharge
+LIVE_DISPLAY_INTERVAL = 0.25  # seconds - minimum time between live display refreshes
+TEST_SAMPLE_RATE = 1.0  # Hz - simulated power samples per second in test mode
+BATTERY_STATE_CACHE_TTL = 300  # seconds - re-poll cached battery schedule/mode after this long
 
 # Battery mode registers
 MODE_REGISTER = 47086
@@ -1,9 +1,16 @@
 import asyncio
+import sys
 import time
 import logging
 import math
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import random
+import bisect
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Tuple
 import aiohttp
 import tibber
 
@@ -11,22 +18,139 @@ from config import (
     logger, BATTERY_HOST, HIGH_USAGE_THRESHOLD, HIGH_USAGE_DURATION_THRESHOLD,
     MAX_SELF_CONSUMPTION_DURATION, MONITORING_START_HOUR, MONITORING_END_HOUR, 
     MIN_SOC_FOR_DISCHARGE, TOU_MODE, MAX_SELF_CONSUMPTION_MODE, 
-    STOCKHOLM_TZ, TIBBER_TOKEN, MAX_RETRIES, RETRY_DELAY
+    STOCKHOLM_TZ, TIBBER_TOKEN, MAX_RETRIES, RETRY_DELAY, MAX_RETRY_DELAY,
+    BACKOFF_INITIAL, BACKOFF_MIN, BACKOFF_FACTOR, LIVE_DISPLAY_INTERVAL,
+    MAX_CONNECTS_PER_HOUR, TEST_SAMPLE_RATE, BATTERY_STATE_CACHE_TTL
 )
 from battery_manager import BatteryManager
 
+# Day bit for each datetime.weekday() value (Monday=0), using the battery's Sunday=bit 0 convention
+_DAY_BITS = (2, 4, 8, 16, 32, 64, 1)
+
+# Read-only default for missing levels of the Tibber live measurement payload
+_EMPTY = MappingProxyType({})
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Truncated exponential backoff with jitter for retry attempt number `attempt` (1-based).
+    The first retry waits a random delay so restarted clients don't reconnect in lockstep.
+    """
+    if attempt <= 1:
+        return random.random() * BACKOFF_INITIAL
+    return min(BACKOFF_MIN * BACKOFF_FACTOR ** (attempt - 1) + random.uniform(0, 1), MAX_RETRY_DELAY)
+
+def create_websession() -> aiohttp.ClientSession:
+    """
+    Create the long-lived HTTP session shared by all Tibber requests.
+    The connector keeps idle connections and resolved addresses around so reconnects
+    and API calls reuse them instead of paying for new DNS lookups and TLS handshakes.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=20,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        keepalive_timeout=75
+    )
+    return aiohttp.ClientSession(connector=connector)
+
 class BatteryModeManager:
     """Class to manage battery mode changes and track state."""
     
+    __slots__ = (
+        'battery_manager', 'in_high_usage_mode',
+        '_period_cache', '_period_cache_key', '_uniform_periods',
+        '_cached_schedule', '_cached_schedule_version', '_schedule_read_time',
+        '_cached_mode', '_mode_read_time'
+    )
+    
     def __init__(self, battery_manager: BatteryManager):
         self.battery_manager = battery_manager
         self.in_high_usage_mode = False
-        self.mode_switch_time = 0
+        # Per day bit: parallel arrays (starts, adjusted ends, latest-ending discharge index) sorted by start time
+        self._period_cache: Dict[int, Tuple[array, array, array]] = {}
+        self._period_cache_key = None
+        # Shared lookup arrays when every day of the week has the same periods
+        self._uniform_periods: Optional[Tuple[array, array, array]] = None
+        # Schedule and mode only change when written, so keep the last read and re-poll after a TTL
+        self._cached_schedule: Optional[Dict] = None
+        self._cached_schedule_version = -1
+        self._schedule_read_time = 0.0
+        self._cached_mode: Optional[int] = None
+        self._mode_read_time = 0.0
+        
+    def _update_period_cache(self, periods: List[Dict]) -> None:
+        """Rebuild the per-day period lookup arrays if the schedule has changed."""
+        key = tuple((p['start_time'], p['end_time'], p['days'], p['is_charging']) for p in periods)
+        if key == self._period_cache_key:
+            return
+            
+        entries_by_day = {}
+        for day_bit in _DAY_BITS:
+            entries = []
+            for start_time, end_time, days, is_charging in key:
+                if not (days & day_bit):
+                    continue
+                # Handle midnight crossing
+                if end_time < start_time:
+                    end_time += 1440  # Add 24 hours in minutes
+                entries.append((start_time, end_time, is_charging))
+            entries.sort()
+            entries_by_day[day_bit] = entries
+            
+        def to_arrays(entries):
+            # For each entry, the index of the latest-ending discharging period among it and all
+            # earlier-starting entries (-1 if none), so overlapping periods are still found
+            best = array('h')
+            best_idx = -1
+            for i, (_, end_time, is_charging) in enumerate(entries):
+                if not is_charging and (best_idx < 0 or end_time > entries[best_idx][1]):
+                    best_idx = i
+                best.append(best_idx)
+            return (
+                array('H', [entry[0] for entry in entries]),
+                array('H', [entry[1] for entry in entries]),
+                best
+            )
+            
+        # Most schedules repeat every day, in which case one set of arrays serves the whole week
+        first = entries_by_day[_DAY_BITS[0]]
+        if all(entries == first for entries in entries_by_day.values()):
+            self._uniform_periods = to_arrays(first)
+            self._period_cache = {}
+        else:
+            self._uniform_periods = None
+            self._period_cache = {day_bit: to_arrays(entries) for day_bit, entries in entries_by_day.items()}
+        self._period_cache_key = key
+        
+    def _get_schedule(self) -> Optional[Dict]:
+        """
+        Return the battery schedule, reading it from the battery only if the cached copy
+        is missing, older than BATTERY_STATE_CACHE_TTL or invalidated by a schedule write.
+        """
+        now = time.monotonic()
+        if (self._cached_schedule is None
+                or self._cached_schedule_version != self.battery_manager.schedule_version
+                or now - self._schedule_read_time > BATTERY_STATE_CACHE_TTL):
+            schedule = self.battery_manager.read_schedule()
+            if schedule is None:
+                return None
+            self._cached_schedule = schedule
+            self._cached_schedule_version = self.battery_manager.schedule_version
+            self._schedule_read_time = now
+        return self._cached_schedule
+        
+    def _set_cached_mode(self, mode: Optional[int]) -> None:
+        """Remember the battery mode we last read or wrote."""
+        self._cached_mode = mode
+        self._mode_read_time = time.monotonic()
         
     def get_current_mode(self) -> Optional[int]:
-        """Get the current battery mode."""
+        """Get the current battery mode, using the cached value while it is fresh."""
+        if self._cached_mode is not None and time.monotonic() - self._mode_read_time <= BATTERY_STATE_CACHE_TTL:
+            return self._cached_mode
         try:
             mode = self.battery_manager.get_mode()
+            self._set_cached_mode(mode)
             return mode
         except Exception as e:
             logger.error(f"Error reading battery mode: {e}")
@@ -41,38 +165,37 @@ class BatteryModeManager:
         """
         try:
             # Get current schedule
-            schedule = self.battery_manager.read_schedule()
+            schedule = self._get_schedule()
             if not schedule or 'periods' not in schedule or not schedule['periods']:
                 return False
                 
+            self._update_period_cache(schedule['periods'])
+                
             # Get current time and day
             now = datetime.now(STOCKHOLM_TZ)
             current_minutes = now.hour * 60 + now.minute
-            current_day_bit = 1 << ((now.weekday() + 1) % 7)  # Sunday=0, Monday=1, etc.
+            starts, ends, best_discharge = self._uniform_periods or self._period_cache[_DAY_BITS[now.weekday()]]
             
-            # Check each period
-            for period in schedule['periods']:
-                # Check if period is for today
-                if not (period['days'] & current_day_bit):
-                    continue
-                    
-                # Check if period is active now
-                start_time = period['start_time']
-                end_time = period['end_time']
-                
-                # Handle midnight crossing
-                if end_time < start_time:
-                    end_time += 1440  # Add 24 hours in minutes
+            # Among the periods starting at or before now, take the discharging one that ends last
+            idx = bisect.bisect_right(starts, current_minutes) - 1
+            if idx < 0 or best_discharge[idx] < 0:
+                return False
                 
-                if start_time <= current_minutes < end_time:
-                    # Period is active now, check if it's discharging
-                    if not period['is_charging']:
-                        logger.info(f"Currently in an active discharging period: {start_time//60:02d}:{start_time%60:02d}-{end_time//60:02d}:{end_time%60:02d}")
-                        return True
+            idx = best_discharge[idx]
+            start_time = starts[idx]
+            end_time = ends[idx]
+            if current_minutes < end_time:
+                start_hh, start_mm = divmod(start_time, 60)
+                end_hh, end_mm = divmod(end_time, 60)
+                logger.info(
+                    "Currently in an active discharging period: %02d:%02d-%02d:%02d",
+                    start_hh, start_mm, end_hh, end_mm
+                )
+                return True
             
             return False
         except Exception as e:
-            logger.error(f"Error checking if currently discharging: {e}")
+            logger.error("Error checking if currently discharging: %s", e)
             return False
             
     def switch_to_max_self_consumption(self, soc: float) -> bool:
@@ -108,11 +231,12 @@ class BatteryModeManager:
             # Switch to Max Self-Consumption mode
             success = self.battery_manager.set_mode(MAX_SELF_CONSUMPTION_MODE)
             if success:
+                self._set_cached_mode(MAX_SELF_CONSUMPTION_MODE)
                 self.in_high_usage_mode = True
-                self.mode_switch_time = time.time()
                 logger.info("Successfully switched to max self-consumption mode")
                 return True
             else:
+                self._cached_mode = None  # Battery state is uncertain, re-read next time
                 logger.error("Failed to switch to max self-consumption mode")
                 return False
         except Exception as e:
@@ -130,38 +254,32 @@ class BatteryModeManager:
             # Switch to TOU mode
             success = self.battery_manager.set_mode(TOU_MODE)
             if success:
+                self._set_cached_mode(TOU_MODE)
                 self.in_high_usage_mode = False
                 logger.info("Successfully switched back to TOU mode")
                 return True
             else:
+                self._cached_mode = None  # Battery state is uncertain, re-read next time
                 logger.error("Failed to switch back to TOU mode")
                 # We'll retry later
                 return False
         except Exception as e:
             logger.error(f"Error switching to TOU mode: {e}")
             return False
-            
-    def handle_mode_maintenance(self) -> None:
-        """
-        Periodically check and fix battery mode if necessary.
-        This should be called regularly to ensure the battery
-        returns to TOU mode after the high usage period.
-        """
-        try:
-            if not self.in_high_usage_mode:
-                return
-                
-            # Check if we need to switch back to TOU mode
-            elapsed_time = time.time() - self.mode_switch_time
-            if elapsed_time >= MAX_SELF_CONSUMPTION_DURATION:
-                logger.info(f"Maximum self-consumption duration reached ({MAX_SELF_CONSUMPTION_DURATION} seconds)")
-                self.switch_to_tou_mode()
-        except Exception as e:
-            logger.error(f"Error in mode maintenance: {e}")
 
 class HighUsageMonitor:
     """Monitor for high power usage and trigger battery mode changes."""
     
+    __slots__ = (
+        'battery_manager', 'battery_mode_manager', 'high_usage_count',
+        'tibber_connection', 'home', 'stopped', 'test_mode', 'websession',
+        '_subscription_task', '_unsub', '_home_ws_close', '_reconnect_task',
+        '_last_data_mono', '_connection_active', '_reconnect_attempt', '_conn_times',
+        '_hour_deadline', '_cached_in_window', '_battery_executor', '_trip_task',
+        '_revert_handle', '_revert_task', 'live_display', 'current_power_kw',
+        'display_active', '_last_display_mono', '_display_interval'
+    )
+    
     def __init__(self, test_mode: bool = False, websession = None, live_display: bool = True):
         self.battery_manager = BatteryManager(BATTERY_HOST)
         self.battery_mode_manager = BatteryModeManager(self.battery_manager)
@@ -172,14 +290,26 @@ class HighUsageMonitor:
         self.test_mode = test_mode
         self.websession = websession
         self._subscription_task = None
+        # Teardown callables probed once per subscription (None when the library doesn't provide them)
+        self._unsub = None
+        self._home_ws_close = None
         self._reconnect_task = None
-        self._last_data_time = None
+        self._last_data_mono = 0.0  # time.monotonic() of the last received data
         self._connection_active = False
         self._reconnect_attempt = 0
-        self._max_reconnect_delay = 300  # 5 minutes max delay
+        self._conn_times = deque(maxlen=MAX_CONNECTS_PER_HOUR)  # time.monotonic() of recent connection attempts
+        self._hour_deadline = 0.0  # time.monotonic() at which the monitoring window must be re-checked
+        self._cached_in_window = False
+        # Single worker so Modbus register access from trip handling is serialized
+        self._battery_executor = ThreadPoolExecutor(max_workers=1)
+        self._trip_task = None
+        self._revert_handle = None  # Timer that switches back to TOU mode
+        self._revert_task = None
         self.live_display = live_display
         self.current_power_kw = 0.0
         self.display_active = False
+        self._last_display_mono = 0.0
+        self._display_interval = LIVE_DISPLAY_INTERVAL
         
         if self.test_mode:
             logger.info("Test mode enabled - battery connections will be simulated")
@@ -190,7 +320,7 @@ class HighUsageMonitor:
             logger.info("Initializing Tibber connection...")
             self.tibber_connection = tibber.Tibber(
                 TIBBER_TOKEN, 
-                websession=websession,
+                websession=websession or self.websession,
                 user_agent="BatteryManagementSystem"
             )
             await self.tibber_connection.update_info()
@@ -225,20 +355,26 @@ class HighUsageMonitor:
         if not self.live_display:
             return
             
-        now = datetime.now().strftime("%H:%M:%S")
-        status = "HIGH" if power_kw >= HIGH_USAGE_THRESHOLD else "Normal"
-        
         # Store current power reading
         self.current_power_kw = power_kw
         
-        # Create the display string - use carriage return to stay on same line
-        display = f"\r[{now}] Power: {power_kw:.2f} kW | Status: {status}"
+        # Throttle terminal writes to the configured refresh rate
+        mono = time.monotonic()
+        if mono - self._last_display_mono < self._display_interval:
+            return
+        self._last_display_mono = mono
+        
+        # Only take a timestamp when the display actually redraws
+        now = datetime.now()
+        status = "HIGH" if power_kw >= HIGH_USAGE_THRESHOLD else "Normal"
         
-        # Pad with spaces to clear any previous longer output
-        display = display.ljust(60)
+        # Create the display string - use carriage return to stay on same line,
+        # padded with spaces to clear any previous longer output
+        display = f"\r[{now:%H:%M:%S}] Power: {power_kw:6.2f} kW | Status: {status}".ljust(60)
         
-        # Print without newline and flush to ensure immediate display
-        print(display, end='', flush=True)
+        # Write without newline and flush to ensure immediate display
+        sys.stdout.write(display)
+        sys.stdout.flush()
         self.display_active = True
         
     def _print_newline_if_needed(self):
@@ -251,19 +387,12 @@ class HighUsageMonitor:
         """Callback function for real-time Tibber data."""
         try:
             # Update last data timestamp
-            self._last_data_time = datetime.now()
+            mono = time.monotonic()
+            self._last_data_mono = mono
             self._connection_active = True
             self._reconnect_attempt = 0  # Reset reconnection attempts on successful data
             
-            data = package.get("data")
-            if data is None:
-                return
-
-            live_measurement = data.get("liveMeasurement")
-            if live_measurement is None:
-                return
-
-            power = live_measurement.get("power")
+            power = ((package.get("data") or _EMPTY).get("liveMeasurement") or _EMPTY).get("power")
             if power is None:
                 return
 
@@ -273,60 +402,107 @@ class HighUsageMonitor:
             # Update the live display with just power reading
             self._update_live_display(power_kw)
             
-            now = datetime.now(STOCKHOLM_TZ)
-            current_hour = now.hour
+            # Fast path: normal usage with nothing in progress needs no further checks
+            if power_kw < HIGH_USAGE_THRESHOLD and self.high_usage_count == 0 and not self.battery_mode_manager.in_high_usage_mode:
+                return
+            
+            # Only re-evaluate the monitoring window once per hour
+            if mono >= self._hour_deadline:
+                now = datetime.now(STOCKHOLM_TZ)
+                self._cached_in_window = MONITORING_START_HOUR <= now.hour < MONITORING_END_HOUR
+                self._hour_deadline = mono + (3600 - now.minute * 60 - now.second)
             
             # Check if we're within monitoring hours
-            if not (MONITORING_START_HOUR <= current_hour < MONITORING_END_HOUR):
+            if not self._cached_in_window:
                 return
                 
             # Check if we're already in high usage mode
             if self.battery_mode_manager.in_high_usage_mode:
-                # Maintenance will handle switching back to TOU mode
-                self.battery_mode_manager.handle_mode_maintenance()
+                # The scheduled revert will handle switching back to TOU mode
                 return
             
+            cnt = self.high_usage_count
+            thr = HIGH_USAGE_DURATION_THRESHOLD
+            
             # Check for high usage
             if power_kw >= HIGH_USAGE_THRESHOLD:
-                if self.high_usage_count == 0:
+                if cnt == 0:
                     self._print_newline_if_needed()
-                    logger.info(f"Detected high power usage: {power_kw:.2f} kW")
+                    logger.info("Detected high power usage: %.2f kW", power_kw)
                 
-                self.high_usage_count += 1
+                cnt += 1
                 
                 # Only log every few counts to reduce spam
-                if self.high_usage_count % 3 == 0 or self.high_usage_count == HIGH_USAGE_DURATION_THRESHOLD:
+                if cnt % 3 == 0 or cnt == thr:
                     self._print_newline_if_needed()
-                    logger.info(f"High power usage continues: {power_kw:.2f} kW (count: {self.high_usage_count}/{HIGH_USAGE_DURATION_THRESHOLD})")
+                    logger.info(
+                        "High power usage continues: %.2f kW (count: %d/%d)",
+                        power_kw, cnt, thr
+                    )
                 
-                if self.high_usage_count >= HIGH_USAGE_DURATION_THRESHOLD:
+                if cnt >= thr:
                     self._print_newline_if_needed()
-                    logger.info(f"Sustained high power usage detected: {power_kw:.2f} kW for {HIGH_USAGE_DURATION_THRESHOLD} seconds")
+                    logger.info(
+                        "Sustained high power usage detected: %.2f kW for %d seconds",
+                        power_kw, thr
+                    )
+                    cnt = 0
                     
-                    # Check if already in a discharging period
-                    if self.battery_mode_manager.is_currently_discharging():
-                        logger.info("Battery is already in a scheduled discharging period, not switching modes")
-                        self.high_usage_count = 0
-                        return
-                    
-                    # Get battery SOC - only query the battery when actually needed
-                    soc = self.battery_manager.get_soc()
-                    if soc is not None and soc >= MIN_SOC_FOR_DISCHARGE:
-                        self.battery_mode_manager.switch_to_max_self_consumption(soc)
-                    else:
-                        logger.warning(f"Cannot switch to max self-consumption: SOC too low or unknown")
-                    self.high_usage_count = 0
-            else:
-                if self.high_usage_count > 0:
-                    self._print_newline_if_needed()
-                    logger.info(f"Power usage returned to normal: {power_kw:.2f} kW")
-                    self.high_usage_count = 0
+                    # Battery I/O is blocking, so run it off the event loop; coalesce repeated trips
+                    trip_task = self._trip_task
+                    if not trip_task or trip_task.done():
+                        self._trip_task = asyncio.get_running_loop().create_task(self._handle_trip())
+            elif cnt > 0:
+                self._print_newline_if_needed()
+                logger.info("Power usage returned to normal: %.2f kW", power_kw)
+                cnt = 0
+            
+            self.high_usage_count = cnt
         except Exception as e:
             self._print_newline_if_needed()
-            logger.error(f"Error in Tibber callback: {e}")
+            logger.error("Error in Tibber callback: %s", e)
             # Reset counter on error to avoid getting stuck
             self.high_usage_count = 0
     
+    def _wrapped_callback(self, pkg: Dict[str, Any]) -> None:
+        """Subscription callback that ignores data once the monitor is stopped."""
+        if self.stopped:
+            return
+        try:
+            self.tibber_callback(pkg)
+        except Exception as e:
+            logger.error("Error in tibber callback: %s", e)
+    
+    async def _handle_trip(self) -> None:
+        """Check the schedule and switch battery mode after sustained high usage."""
+        loop = asyncio.get_running_loop()
+        try:
+            # Check if already in a discharging period
+            if await loop.run_in_executor(self._battery_executor, self.battery_mode_manager.is_currently_discharging):
+                logger.info("Battery is already in a scheduled discharging period, not switching modes")
+                return
+            
+            # Get battery SOC - only query the battery when actually needed
+            soc = await loop.run_in_executor(self._battery_executor, self.battery_manager.get_soc)
+            if soc is not None and soc >= MIN_SOC_FOR_DISCHARGE:
+                switched = await loop.run_in_executor(
+                    self._battery_executor,
+                    self.battery_mode_manager.switch_to_max_self_consumption,
+                    soc
+                )
+                if switched:
+                    self._schedule_tou_revert()
+            else:
+                logger.warning("Cannot switch to max self-consumption: SOC too low or unknown")
+        except Exception as e:
+            logger.error("Error handling high power usage: %s", e)
+    
+    def _bind_subscription(self) -> None:
+        """Cache the unsubscribe and websocket close callables for the current subscription."""
+        self._unsub = getattr(self._subscription_task, 'unsubscribe', None)
+        ws = getattr(self.home, '_ws', None)
+        self._home_ws_close = ws.close if ws else None
+        
     async def _monitor_connection(self):
         """Monitor the connection and reconnect if needed."""
         while not self.stopped:
@@ -337,10 +513,7 @@ class HighUsageMonitor:
                     continue
                 
                 # Check if we have a recent data point
-                now = datetime.now()
-                if (self._last_data_time is not None and 
-                    self._connection_active and 
-                    (now - self._last_data_time) > timedelta(minutes=5)):
+                if self._connection_active and (time.monotonic() - self._last_data_mono) > 300:
                     
                     logger.warning(f"No data received for over 5 minutes, connection may be stale")
                     self._connection_active = False
@@ -348,18 +521,18 @@ class HighUsageMonitor:
                     # Trigger reconnect
                     if self._subscription_task:
                         # Cancel existing subscription
-                        if hasattr(self._subscription_task, 'unsubscribe'):
+                        if self._unsub:
                             try:
-                                await self._subscription_task.unsubscribe()
+                                await self._unsub()
                             except Exception as e:
                                 logger.error(f"Error unsubscribing: {e}")
                         
                         # Close websocket if available
-                        if self.home and hasattr(self.home, '_ws') and self.home._ws:
+                        if self._home_ws_close:
                             try:
                                 self._print_newline_if_needed()
                                 logger.info("Connection lost, attempting to close and reconnect...")
-                                await self.home._ws.close()
+                                await self._home_ws_close()
                             except Exception as e:
                                 self._print_newline_if_needed()
                                 logger.error(f"Error closing websocket: {e}")
@@ -378,13 +551,57 @@ class HighUsageMonitor:
                 logger.error(f"Error in connection monitoring: {e}")
                 await asyncio.sleep(30)  # Wait before next check
     
+    def _schedule_tou_revert(self, delay: float = MAX_SELF_CONSUMPTION_DURATION) -> None:
+        """Schedule the switch back to TOU mode after `delay` seconds."""
+        if self._revert_handle:
+            self._revert_handle.cancel()
+        self._revert_handle = asyncio.get_running_loop().call_later(delay, self._start_tou_revert)
+        
+    def _start_tou_revert(self) -> None:
+        """Timer callback that starts the switch back to TOU mode."""
+        self._revert_handle = None
+        self._revert_task = asyncio.get_running_loop().create_task(self._revert_to_tou())
+        
+    async def _revert_to_tou(self) -> None:
+        """Switch back to TOU mode once the self-consumption period has elapsed."""
+        try:
+            if not self.battery_mode_manager.in_high_usage_mode:
+                return
+                
+            logger.info(f"Maximum self-consumption duration reached ({MAX_SELF_CONSUMPTION_DURATION} seconds)")
+            success = await asyncio.get_running_loop().run_in_executor(
+                self._battery_executor,
+                self.battery_mode_manager.switch_to_tou_mode
+            )
+            if not success and not self.stopped:
+                logger.info(f"Retrying switch to TOU mode in {RETRY_DELAY} seconds")
+                self._schedule_tou_revert(RETRY_DELAY)
+        except Exception as e:
+            logger.error(f"Error switching back to TOU mode: {e}")
+    
+    async def _wait_for_connection_slot(self) -> None:
+        """Delay a new Tibber connection if it would exceed MAX_CONNECTS_PER_HOUR."""
+        now = time.monotonic()
+        while self._conn_times and now - self._conn_times[0] > 3600:
+            self._conn_times.popleft()
+            
+        if len(self._conn_times) >= MAX_CONNECTS_PER_HOUR:
+            wait = 3600 - (now - self._conn_times[0]) + 1
+            logger.warning(
+                f"Reached {MAX_CONNECTS_PER_HOUR} Tibber connections in the last hour, "
+                f"waiting {wait:.0f} seconds before reconnecting"
+            )
+            await asyncio.sleep(wait)
+            
+        self._conn_times.append(time.monotonic())
+    
     async def _reconnect_with_backoff(self):
         """Attempt to reconnect with exponential backoff."""
         # Calculate backoff delay
         self._reconnect_attempt += 1
-        delay = min(RETRY_DELAY * (2 ** (self._reconnect_attempt - 1)), self._max_reconnect_delay)
+        delay = backoff_delay(self._reconnect_attempt)
         
-        logger.info(f"Scheduling reconnection attempt {self._reconnect_attempt} in {delay} seconds")
+        logger.info(f"Scheduling reconnection attempt {self._reconnect_attempt} in {delay:.1f} seconds")
         await asyncio.sleep(delay)
         
         try:
@@ -398,22 +615,15 @@ class HighUsageMonitor:
                     return
             
             # Start a new subscription
+            await self._wait_for_connection_slot()
             logger.info("Starting new Tibber subscription")
             
-            # Define wrapper callback
-            def wrapped_callback(pkg):
-                if self.stopped:
-                    return
-                try:
-                    self.tibber_callback(pkg)
-                except Exception as e:
-                    logger.error(f"Error in tibber callback: {e}")
-            
             # Create new subscription
-            self._subscription_task = await self.home.rt_subscribe(wrapped_callback)
+            self._subscription_task = await self.home.rt_subscribe(self._wrapped_callback)
+            self._bind_subscription()
             logger.info("Successfully reconnected to Tibber")
             self._connection_active = True
-            self._last_data_time = datetime.now()
+            self._last_data_mono = time.monotonic()
             
         except Exception as e:
             logger.error(f"Error during reconnection: {e}")
@@ -424,57 +634,69 @@ class HighUsageMonitor:
         self._print_newline_if_needed()
         logger.info("Running in test mode with simulated power data")
         
-        # Simulate alternating normal and high usage patterns
-        test_start_time = time.time()
+        # Simulate alternating normal and high usage patterns:
+        # a sine wave pattern between 2.0 and 12.0 kW
+        base_power = 7.0  # Average power
+        amplitude = 5.0  # How much it varies by
+        period = 60.0  # Complete cycle in seconds
+        
+        # Precompute one full cycle of samples at the configured sample rate
+        num_samples = max(1, int(period * TEST_SAMPLE_RATE))
+        wave = [
+            base_power + amplitude * math.sin(2 * math.pi * i / num_samples)
+            for i in range(num_samples)
+        ]
+        sample_interval = 1.0 / TEST_SAMPLE_RATE
         
         while not self.stopped:
-            # Simulate varying power levels
-            elapsed = time.time() - test_start_time
-            # Create a sine wave pattern between 2.0 and 12.0 kW
-            base_power = 7.0  # Average power
-            amplitude = 5.0  # How much it varies by
-            period = 60.0  # Complete cycle in seconds
-            
-            # Calculate simulated power using sine wave
-            power_kw = base_power + amplitude * math.sin(2 * math.pi * elapsed / period)
-            
-            # Update live display with just power
-            self._update_live_display(power_kw)
-            
-            # Check for high usage
-            if power_kw >= HIGH_USAGE_THRESHOLD:
-                if self.high_usage_count == 0:
-                    self._print_newline_if_needed()
-                    logger.info(f"Detected high power usage: {power_kw:.2f} kW")
-                
-                self.high_usage_count += 1
-                
-                # Log periodically
-                if self.high_usage_count % 3 == 0:
-                    self._print_newline_if_needed()
-                    logger.info(f"High power usage continues: {power_kw:.2f} kW (count: {self.high_usage_count}/{HIGH_USAGE_DURATION_THRESHOLD})")
+            for power_kw in wave:
+                if self.stopped:
+                    break
+                self._handle_test_sample(power_kw)
                 
-                if self.high_usage_count >= HIGH_USAGE_DURATION_THRESHOLD:
-                    self._print_newline_if_needed()
-                    logger.info(f"Sustained high power usage detected: {power_kw:.2f} kW for {HIGH_USAGE_DURATION_THRESHOLD} seconds")
-                    soc = 50.0  # Simulate SOC in test mode
-                    logger.info(f"Switching to max self-consumption mode (SOC: {soc}%)")
-                    logger.info("TEST MODE: Simulating battery mode switch")
-                    self.battery_mode_manager.in_high_usage_mode = True
-                    self.battery_mode_manager.mode_switch_time = time.time()
-                    logger.info("Successfully switched to max self-consumption mode")
-                    self.high_usage_count = 0
-            else:
-                if self.high_usage_count > 0:
-                    self._print_newline_if_needed()
-                    logger.info(f"Power usage returned to normal: {power_kw:.2f} kW")
-                    self.high_usage_count = 0
-            
-            # Handle mode maintenance
-            self.battery_mode_manager.handle_mode_maintenance()
-            
-            # Wait before updating again
-            await asyncio.sleep(1)
+                # Wait before updating again
+                await asyncio.sleep(sample_interval)
+    
+    def _handle_test_sample(self, power_kw: float) -> None:
+        """Process one simulated power reading in test mode."""
+        # Update live display with just power
+        self._update_live_display(power_kw)
+        
+        # Check for high usage
+        if power_kw >= HIGH_USAGE_THRESHOLD:
+            if self.high_usage_count == 0:
+                self._print_newline_if_needed()
+                logger.info("Detected high power usage: %.2f kW", power_kw)
+            
+            self.high_usage_count += 1
+            
+            # Log periodically
+            if self.high_usage_count % 3 == 0:
+                self._print_newline_if_needed()
+                logger.info(
+                    "High power usage continues: %.2f kW (count: %d/%d)",
+                    power_kw, self.high_usage_count, HIGH_USAGE_DURATION_THRESHOLD
+                )
+            
+            if self.high_usage_count >= HIGH_USAGE_DURATION_THRESHOLD:
+                self._print_newline_if_needed()
+                # Samples arrive at TEST_SAMPLE_RATE per second, not one per second
+                logger.info(
+                    "Sustained high power usage detected: %.2f kW for %.1f seconds",
+                    power_kw, self.high_usage_count / TEST_SAMPLE_RATE
+                )
+                soc = 50.0  # Simulate SOC in test mode
+                logger.info(f"Switching to max self-consumption mode (SOC: {soc}%)")
+                logger.info("TEST MODE: Simulating battery mode switch")
+                self.battery_mode_manager.in_high_usage_mode = True
+                self._schedule_tou_revert()
+                logger.info("Successfully switched to max self-consumption mode")
+                self.high_usage_count = 0
+        else:
+            if self.high_usage_count > 0:
+                self._print_newline_if_needed()
+                logger.info("Power usage returned to normal: %.2f kW", power_kw)
+                self.high_usage_count = 0
             
     async def start_monitoring(self) -> None:
         """Start the real-time monitoring."""
@@ -497,21 +719,14 @@ class HighUsageMonitor:
             # Subscribe to real-time measurements
             logger.info("Subscribing to real-time measurements...")
             
-            # Define a wrapper callback that checks if we're stopped
-            def wrapped_callback(pkg):
-                if self.stopped:
-                    return
-                try:
-                    self.tibber_callback(pkg)
-                except Exception as e:
-                    logger.error(f"Error in tibber callback: {e}")
-            
             # Start the subscription
             try:
-                self._subscription_task = await self.home.rt_subscribe(wrapped_callback)
+                await self._wait_for_connection_slot()
+                self._subscription_task = await self.home.rt_subscribe(self._wrapped_callback)
+                self._bind_subscription()
                 logger.info("Successfully subscribed to real-time measurements")
                 self._connection_active = True
-                self._last_data_time = datetime.now()
+                self._last_data_mono = time.monotonic()
             except Exception as e:
                 logger.error(f"Error subscribing to real-time measurements: {e}")
                 raise
@@ -523,9 +738,6 @@ class HighUsageMonitor:
             while not self.stopped:
                 try:
                     await asyncio.sleep(10)
-                    
-                    # Ensure mode maintenance happens even without Tibber updates
-                    self.battery_mode_manager.handle_mode_maintenance()
                 except asyncio.CancelledError:
                     logger.info("Monitoring loop cancelled")
                     break
@@ -541,7 +753,7 @@ class HighUsageMonitor:
             logger.error(f"Error in rt_subscribe: {e}")
         finally:
             # Attempt to close any ongoing subscription
-            if hasattr(self, '_subscription_task') and self._subscription_task:
+            if self._subscription_task:
                 logger.info("Cleaning up subscription task")
                 
             logger.info("Monitoring stopped")
@@ -559,24 +771,35 @@ class HighUsageMonitor:
         self.stopped = True
         
         # Cancel reconnect task if running
-        if hasattr(self, '_reconnect_task') and self._reconnect_task and not self._reconnect_task.done():
+        if self._reconnect_task and not self._reconnect_task.done():
             self._reconnect_task.cancel()
             
+        # Cancel any pending TOU revert, the mode is restored below
+        if self._revert_handle:
+            self._revert_handle.cancel()
+            self._revert_handle = None
+            
+        # Stop in-flight trip and revert handling before the final mode switch
+        battery_tasks = [t for t in (self._trip_task, self._revert_task) if t and not t.done()]
+        for task in battery_tasks:
+            task.cancel()
+        if battery_tasks:
+            await asyncio.gather(*battery_tasks, return_exceptions=True)
+            
         # Try to unsubscribe from Tibber
-        if hasattr(self, '_subscription_task') and self._subscription_task:
+        if self._unsub:
             try:
-                if hasattr(self._subscription_task, 'unsubscribe'):
-                    logger.info("Unsubscribing from Tibber")
-                    await self._subscription_task.unsubscribe()
+                logger.info("Unsubscribing from Tibber")
+                await self._unsub()
             except Exception as e:
                 logger.error(f"Error unsubscribing from Tibber: {e}")
         
         # Close any open websocket
         if self.home:
             try:
-                if hasattr(self.home, '_ws') and self.home._ws:
+                if self._home_ws_close:
                     logger.info("Closing Tibber websocket connection")
-                    await self.home._ws.close()
+                    await self._home_ws_close()
                     logger.info("Tibber websocket connection closed")
                     
                 # Force cleanup the subscription if available
@@ -585,13 +808,20 @@ class HighUsageMonitor:
             except Exception as e:
                 logger.error(f"Error closing Tibber websocket: {e}")
                 
-        # If battery is in high usage mode, switch back to TOU
+        # If battery is in high usage mode, switch back to TOU. Run it on the battery executor
+        # so it queues behind any Modbus call a cancelled task left running there
         if self.battery_mode_manager and self.battery_mode_manager.in_high_usage_mode:
             try:
                 logger.info("Switching battery back to TOU mode before exit")
-                self.battery_mode_manager.switch_to_tou_mode()
+                await asyncio.get_running_loop().run_in_executor(
+                    self._battery_executor,
+                    self.battery_mode_manager.switch_to_tou_mode
+                )
             except Exception as e:
                 logger.error(f"Error switching battery mode: {e}")
+        
+        # Nothing is queued any more, so this only joins the idle worker
+        self._battery_executor.shutdown(wait=True)
 
 async def run_monitor(test_mode: bool = False, live_display: bool = True) -> None:
     """Run the high usage monitor with retry logic."""
@@ -600,43 +830,47 @@ async def run_monitor(test_mode: bool = False, live_display: bool = True) -> Non
     max_retries = MAX_RETRIES
     retry_delay = RETRY_DELAY
     
-    try:
-        monitor = HighUsageMonitor(test_mode=test_mode, live_display=live_display)
+    # Share one HTTP session (connection pool, DNS cache, TLS) across all retries and reconnects
+    async with create_websession() as websession:
+        try:
+            monitor = HighUsageMonitor(
+                test_mode=test_mode, websession=websession, live_display=live_display
+            )
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                # Initialize Tibber connection
-                success = await monitor.initialize_tibber()
-                if success:
-                    # Start monitoring
-                    await monitor.start_monitoring()
-                    break
-                else:
-                    logger.warning(f"Failed to initialize Tibber, retrying... (attempt {attempt}/{max_retries})")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-            except asyncio.CancelledError:
-                logger.info("Monitor cancelled during execution")
-                raise
-            except Exception as e:
-                logger.error(f"Error running high usage monitor: {e}")
-                if attempt < max_retries:
-                    logger.info(f"Retrying in {retry_delay} seconds...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    logger.error(f"Failed to run high usage monitor after {max_retries} attempts")
-                    break
-    except asyncio.CancelledError:
-        logger.info("Monitor task cancelled")
-        raise
-    finally:
-        # Clean up resources if monitor was created
-        if monitor:
-            try:
-                await monitor.cleanup()
-            except Exception as e:
-                logger.error(f"Error during cleanup: {e}")
+            for attempt in range(1, max_retries + 1):
+                try:
+                    # Initialize Tibber connection
+                    success = await monitor.initialize_tibber()
+                    if success:
+                        # Start monitoring
+                        await monitor.start_monitoring()
+                        break
+                    else:
+                        logger.warning(f"Failed to initialize Tibber, retrying... (attempt {attempt}/{max_retries})")
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY) + random.uniform(0, retry_delay * 0.1)  # Capped exponential backoff with jitter
+                except asyncio.CancelledError:
+                    logger.info("Monitor cancelled during execution")
+                    raise
+                except Exception as e:
+                    logger.error(f"Error running high usage monitor: {e}")
+                    if attempt < max_retries:
+                        logger.info(f"Retrying in {retry_delay:.1f} seconds...")
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY) + random.uniform(0, retry_delay * 0.1)  # Capped exponential backoff with jitter
+                    else:
+                        logger.error(f"Failed to run high usage monitor after {max_retries} attempts")
+                        break
+        except asyncio.CancelledError:
+            logger.info("Monitor task cancelled")
+            raise
+        finally:
+            # Clean up resources if monitor was created
+            if monitor:
+                try:
+                    await monitor.cleanup()
+                except Exception as e:
+                    logger.error(f"Error during cleanup: {e}")
 
 # For testing this module directly
 if __name__ == "__main__":
@@ -1,12 +1,14 @@
-from typing import Dict, List, Tuple
-import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+from itertools import chain
+from operator import itemgetter
 from datetime import datetime, timedelta
 from config import (
     logger, EVENING_START_HOUR, EVENING_END_HOUR, 
     NEXT_DAY_START_HOUR, NEXT_DAY_END_HOUR,
     BATTERY_DISCHARGE_RATE, MIN_SOC_FOR_DISCHARGE
 )
-from period_utils import is_day_hour, get_day_bit
+from period_utils import DAY_HOURS, get_day_bit, evening_coverage_mask
 from period_manager import PeriodManager
 
 class OptimizationManager:
@@ -15,57 +17,50 @@ class OptimizationManager:
         self.max_discharging_periods = max_discharging_periods
         self.period_manager = PeriodManager()
 
-    def get_night_prices(self, today_prices: List[Dict], tomorrow_prices: List[Dict]) -> List[Dict]:
-        """Get prices for night hours (22:00-06:00)."""
-        night_prices = []
-        
-        # Add today's late evening hours (22:00-23:59)
-        for price in today_prices:
-            if price['hour'] >= 22:
-                night_prices.append(price)
-                
-        # Add tomorrow's early morning hours (00:00-06:00)
-        for price in tomorrow_prices:
-            if price['hour'] <= 6:
-                night_prices.append(price)
-                
-        return sorted(night_prices, key=lambda x: x['SEK_per_kWh'])
+    def _iter_night_prices(self, today_prices: List[Dict], tomorrow_prices: List[Dict]) -> Iterable[Dict]:
+        """Yield today's late evening (22:00-23:59) and tomorrow's early morning (00:00-06:00) prices."""
+        return chain(
+            (price for price in today_prices if price['hour'] >= 22),
+            (price for price in tomorrow_prices if price['hour'] <= 6)
+        )
+
+    def get_night_prices(self, today_prices: List[Dict], tomorrow_prices: List[Dict],
+                         limit: Optional[int] = None) -> List[Dict]:
+        """Get prices for night hours (22:00-06:00), cheapest first; only the `limit` cheapest if given."""
+        night_prices = self._iter_night_prices(today_prices, tomorrow_prices)
+        if limit is not None:
+            return heapq.nsmallest(limit, night_prices, key=itemgetter('SEK_per_kWh'))
+        return sorted(night_prices, key=itemgetter('SEK_per_kWh'))
 
-    def process_charging_periods(self, night_prices: List[Dict], target_date: datetime) -> List[Dict]:
+    def process_charging_periods(self, night_prices: Iterable[Dict], target_date: datetime) -> List[Dict]:
         """Process and create charging periods for night hours."""
-        selected_prices = sorted(night_prices[:self.max_charging_periods], key=lambda x: x['hour'])
+        cheapest = heapq.nsmallest(self.max_charging_periods, night_prices, key=itemgetter('SEK_per_kWh'))
+        selected_prices = sorted(cheapest, key=itemgetter('hour'))
+        
+        # Hours from 22:00 belong to the evening before the target date
+        today_bit = get_day_bit(target_date)
+        yesterday_bit = get_day_bit(target_date - timedelta(days=1))
         
         periods = []
         for price in selected_prices:
-            period_date = target_date - timedelta(days=1) if price['hour'] >= 22 else target_date
-            day_bit = get_day_bit(period_date)
+            day_bit = yesterday_bit if price['hour'] >= 22 else today_bit
             
             periods.append(
-                self.period_manager.create_period(
-                    start_hour=price['hour'],
-                    end_hour=(price['hour'] + 1) % 24,
-                    is_charging=True,
-                    day_bit=day_bit
-                )
+                self.period_manager.create_hour_period(price['hour'], is_charging=True, day_bit=day_bit)
             )
         
         return self.period_manager.combine_consecutive_periods(periods)
 
-    def process_discharging_periods(self, df: pd.DataFrame, day_bit: int) -> List[Dict]:
+    def process_discharging_periods(self, tomorrow_prices: List[Dict], day_bit: int) -> List[Dict]:
         """Process and create periods for discharging during daytime."""
-        day_df = df[df['hour'].apply(is_day_hour)]
-        best_hours_df = day_df.nlargest(self.max_discharging_periods, 'SEK_per_kWh')
-        selected_hours = sorted(best_hours_df['hour'].tolist())
+        day_prices = (p for p in tomorrow_prices if p['hour'] in DAY_HOURS)
+        best_prices = heapq.nlargest(self.max_discharging_periods, day_prices, key=itemgetter('SEK_per_kWh'))
+        selected_hours = sorted(p['hour'] for p in best_prices)
         
         periods = []
         for hour in selected_hours:
             periods.append(
-                self.period_manager.create_period(
-                    start_hour=hour,
-                    end_hour=(hour + 1) % 24,
-                    is_charging=False,
-                    day_bit=day_bit
-                )
+                self.period_manager.create_hour_period(hour, is_charging=False, day_bit=day_bit)
             )
         
         return self.period_manager.combine_consecutive_periods(periods)
@@ -74,69 +69,60 @@ class OptimizationManager:
                            tomorrow_prices: List[Dict],
                            target_date: datetime) -> Tuple[List[Dict], List[Dict]]:
         """Find optimal charging and discharging periods."""
-        night_prices = self.get_night_prices(today_prices, tomorrow_prices)
+        # Select the cheapest night hours in one pass, without building a sorted night list
+        night_prices = self._iter_night_prices(today_prices, tomorrow_prices)
         charging_periods = self.process_charging_periods(night_prices, target_date)
 
-        day_df = pd.DataFrame(tomorrow_prices)
         discharging_periods = self.process_discharging_periods(
-            day_df, 
+            tomorrow_prices, 
             get_day_bit(target_date)
         )
 
         return charging_periods, discharging_periods
     
-    def calculate_evening_coverage(self, current_periods: List[Dict], today_prices: List[Dict]) -> Tuple[List[Dict], float]:
+    def calculate_evening_coverage_mask(self, current_periods: List[Dict], today_prices: List[Dict],
+                                        current_time: Optional[datetime] = None) -> Tuple[List[Dict], int]:
         """
-        Calculate how many hours are covered in the evening period by existing schedules.
+        Calculate which evening hours are covered by existing schedules.
         
         Args:
             current_periods: List of current schedule periods
             today_prices: List of today's price data
+            current_time: Time to take the current day from (defaults to now)
             
         Returns:
-            Tuple of (evening price data, hours already covered)
+            Tuple of (evening price data, bitmask of covered evening hours)
         """
         # Get current day bit
-        now = datetime.now()
-        current_day_bit = 1 << ((now.weekday() + 1) % 7)  # Sunday=0 convention
+        current_day_bit = get_day_bit(current_time or datetime.now())
         
         # Filter prices for evening hours
         evening_prices = [p for p in today_prices if EVENING_START_HOUR <= p['hour'] < EVENING_END_HOUR]
         
-        # Track coverage by hour
-        hours_coverage = {hour: False for hour in range(EVENING_START_HOUR, EVENING_END_HOUR)}
-        
-        # Check each period if it covers evening hours
-        for period in current_periods:
-            # Skip if not for today
-            if not (period['days'] & current_day_bit):
-                continue
-                
-            # Skip charging periods (we only care about discharging for evening optimization)
-            if period['is_charging']:
-                continue
-                
-            # Convert to hours for comparison
-            start_hour = period['start_time'] // 60
-            end_hour = period['end_time'] // 60
+        # Bitmask of evening hours covered by today's discharging periods
+        coverage = evening_coverage_mask(current_periods, current_day_bit)
+        
+        # bin().count() rather than int.bit_count(), which needs Python 3.10
+        hours_covered = bin(coverage).count('1')
+        logger.info(f"Evening hours already covered: {hours_covered} of {EVENING_END_HOUR - EVENING_START_HOUR}")
+        for hour in range(EVENING_START_HOUR, EVENING_END_HOUR):
+            logger.info(f"  Hour {hour:02d}:00: {'Covered' if coverage >> hour & 1 else 'Not covered'}")
+        
+        return evening_prices, coverage
+    
+    def calculate_evening_coverage(self, current_periods: List[Dict], today_prices: List[Dict]) -> Tuple[List[Dict], float]:
+        """
+        Calculate how many hours are covered in the evening period by existing schedules.
+        
+        Args:
+            current_periods: List of current schedule periods
+            today_prices: List of today's price data
             
-            # Handle midnight crossing
-            if end_hour <= start_hour:
-                end_hour += 24
-                
-            # Check which evening hours are covered
-            for hour in range(EVENING_START_HOUR, EVENING_END_HOUR):
-                if start_hour <= hour < end_hour:
-                    hours_coverage[hour] = True
-        
-        # Calculate total coverage
-        covered_hours = sum(1 for covered in hours_coverage.values() if covered)
-        
-        logger.info(f"Evening hours already covered: {covered_hours} of {EVENING_END_HOUR - EVENING_START_HOUR}")
-        for hour, covered in hours_coverage.items():
-            logger.info(f"  Hour {hour:02d}:00: {'Covered' if covered else 'Not covered'}")
-        
-        return evening_prices, covered_hours
+        Returns:
+            Tuple of (evening price data, hours already covered)
+        """
+        evening_prices, coverage = self.calculate_evening_coverage_mask(current_periods, today_prices)
+        return evening_prices, bin(coverage).count('1')
     
     def calculate_next_day_avg_price(self, tomorrow_prices: List[Dict]) -> float:
         """
@@ -1,10 +1,52 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import heapq
+from operator import itemgetter
 from datetime import datetime
 from config import (
     MAX_MINUTES, MAX_PERIODS, PRICE_THRESHOLD_FACTOR, 
     EVENING_START_HOUR, EVENING_END_HOUR
 )
-from period_utils import get_day_bit, is_day_hour
+from period_utils import get_day_bit, evening_coverage_mask, hourly_price_table
+
+def _period_hour_range(period: Dict) -> range:
+    """Hours spanned by a period (end hour inclusive), unwrapped past midnight; index prices with hour % 24."""
+    start_hour = period['start_time'] // 60
+    duration = (period['end_time'] - period['start_time']) % MAX_MINUTES or MAX_MINUTES
+    return range(start_hour, start_hour + duration // 60 + 1)
+
+def _average_period_price(periods: List[Dict], price_table: List[Optional[float]]) -> Optional[float]:
+    """Average hourly price over all hours the periods span, or None if no hour has a price."""
+    total = 0.0
+    count = 0
+    for period in periods:
+        for hour in _period_hour_range(period):
+            hour_price = price_table[hour % 24]
+            if hour_price:
+                total += hour_price
+                count += 1
+    return total / count if count else None
+
+def _normalize_times(start: int, end: int) -> Tuple[int, int]:
+    """Unwrap a period's end past midnight so that end > start."""
+    if end <= start:
+        end += MAX_MINUTES
+    return start, end
+
+def _period_times(start_hour: int, end_hour: int) -> Tuple[int, int]:
+    """Start and end minutes for a period between two whole hours (0-23)."""
+    start_minutes = start_hour * 60
+    end_minutes = end_hour * 60 if end_hour > start_hour else (end_hour + 24) * 60
+    
+    # Normalize end time: 1440 should be 0
+    if end_minutes == MAX_MINUTES:
+        end_minutes = 0
+    return start_minutes, end_minutes
+
+# Indices of the set bits (0=Sunday .. 6=Saturday) for every 7-bit day mask
+_DAY_INDICES = tuple(tuple(i for i in range(7) if mask >> i & 1) for mask in range(128))
+
+# (start_minutes, end_minutes) for every whole-hour (start_hour, end_hour) pair
+_PERIOD_TIMES = {(s, e): _period_times(s, e) for s in range(24) for e in range(24)}
 
 class PeriodManager:
     def __init__(self):
@@ -18,16 +60,10 @@ class PeriodManager:
         start_hour = start_hour % 24
         end_hour = end_hour % 24
         
-        start_minutes = start_hour * 60
-        end_minutes = end_hour * 60 if end_hour > start_hour else (end_hour + 24) * 60
-                
-        if not (0 <= start_minutes < self.MAX_MINUTES and 
-                0 < end_minutes <= self.MAX_MINUTES * 2):
+        times = _PERIOD_TIMES.get((start_hour, end_hour))
+        if times is None:
             raise ValueError(f"Invalid time range: {start_hour}:00-{end_hour}:00")
-        
-        # Normalize end time: 1440 should be 0
-        if end_minutes == self.MAX_MINUTES:
-            end_minutes = 0
+        start_minutes, end_minutes = times
         
         return {
             'start_time': start_minutes,
@@ -37,51 +73,90 @@ class PeriodManager:
             'is_charging': is_charging
         }
 
+    def create_hour_period(self, hour: int, is_charging: bool, day_bit: int) -> Dict:
+        """Create a one-hour period starting at the given hour (0-23)."""
+        start_minutes = hour * 60
+        
+        return {
+            'start_time': start_minutes,
+            'end_time': 0 if hour == 23 else start_minutes + 60,
+            'charge_flag': 0 if is_charging else 1,
+            'days': day_bit,
+            'is_charging': is_charging
+        }
+
     def combine_consecutive_periods(self, periods: List[Dict]) -> List[Dict]:
         """Combine consecutive periods with the same charging state."""
         if not periods:
             return []
             
-        sorted_periods = sorted(periods, key=lambda x: x['start_time'])
+        sorted_periods = sorted(periods, key=itemgetter('start_time'))
         combined = []
-        current_period = sorted_periods[0].copy()
+        
+        def close_period(period, end_time):
+            # Input periods are never mutated; only a merged period needs a new dict
+            combined.append(period if end_time == period['end_time'] else {**period, 'end_time': end_time})
+        
+        max_minutes = self.MAX_MINUTES
+        current_period = sorted_periods[0]
+        current_end = current_period['end_time']
+        current_charging = current_period['is_charging']
+        current_days = current_period['days']
         
         for next_period in sorted_periods[1:]:
-            current_end_hour = current_period['end_time'] // 60
-            next_start_hour = next_period['start_time'] // 60
-            
-            if (current_end_hour % 24 == next_start_hour % 24 and 
-                current_period['is_charging'] == next_period['is_charging'] and
-                current_period['days'] == next_period['days']):
-                current_period['end_time'] = next_period['end_time']
+            # Compare in minutes; the end may be 0 or unwrapped past midnight
+            if (current_end % max_minutes == next_period['start_time'] and 
+                current_charging == next_period['is_charging'] and
+                current_days == next_period['days']):
+                current_end = next_period['end_time']
             else:
-                combined.append(current_period)
-                current_period = next_period.copy()
+                close_period(current_period, current_end)
+                current_period = next_period
+                current_end = current_period['end_time']
+                current_charging = current_period['is_charging']
+                current_days = current_period['days']
         
-        combined.append(current_period)
+        close_period(current_period, current_end)
         return combined
 
     def check_overlap(self, period1: Dict, period2: Dict) -> bool:
         """Check if two periods overlap in both time and day."""
-        common_days = period1['days'] & period2['days']
-        if not common_days:
+        if not period1['days'] & period2['days']:
             return False
         
-        def normalize_times(period):
-            start = period['start_time']
-            end = period['end_time']
-            if end <= start:
-                end += self.MAX_MINUTES
-            return start, end
+        start1, end1 = period1['start_time'], period1['end_time']
+        start2, end2 = period2['start_time'], period2['end_time']
         
-        start1, end1 = normalize_times(period1)
-        start2, end2 = normalize_times(period2)
-        
-        if start2 < start1 and start2 < end2:
-            start2 += self.MAX_MINUTES
+        # Unwrap periods crossing midnight so that end > start
+        if end1 <= start1:
+            end1 += self.MAX_MINUTES
+        if end2 <= start2:
             end2 += self.MAX_MINUTES
         
-        return not (end1 <= start2 or end2 <= start1)
+        return start1 < end2 and start2 < end1
+
+    def drop_overlapping_periods(self, periods: List[Dict]) -> List[Dict]:
+        """
+        Sort periods by start time and drop any period that overlaps an earlier kept one on a shared day.
+        
+        Kept periods never overlap, so per day only the end of the latest kept period
+        needs checking, which makes this a single sweep instead of pairwise checks.
+        """
+        last_end = [0] * 7  # Normalized end of the latest kept period for each day bit
+        kept = []
+        
+        for period in sorted(periods, key=itemgetter('start_time')):
+            start, end = _normalize_times(period['start_time'], period['end_time'])
+            days = _DAY_INDICES[period['days'] & 0x7F]
+            
+            if any(start < last_end[i] for i in days):
+                continue
+                
+            for i in days:
+                last_end[i] = end
+            kept.append(period)
+            
+        return kept
 
     def is_period_in_future(self, period: Dict, current_time: datetime) -> bool:
         """Check if a period starts after the current time."""
@@ -106,38 +181,14 @@ class PeriodManager:
             return True  # No current discharge periods to compare
 
         # Calculate average price for current discharge periods
-        current_prices = []
-        for period in current_discharge_periods:
-            start_hour = period['start_time'] // 60
-            for hour in range(start_hour, (period['end_time'] // 60) % 24 + 1):
-                hour_price = next(
-                    (p['SEK_per_kWh'] for p in prices['today'] if p['hour'] == hour % 24),
-                    None
-                )
-                if hour_price:
-                    current_prices.append(hour_price)
-        
-        if not current_prices:
+        current_avg_price = _average_period_price(current_discharge_periods, hourly_price_table(prices['today']))
+        if current_avg_price is None:
             return True  # No valid prices found for current periods
-        
-        current_avg_price = sum(current_prices) / len(current_prices)
 
         # Calculate average price for new discharge periods
-        new_prices = []
-        for period in new_discharging_periods:
-            start_hour = period['start_time'] // 60
-            for hour in range(start_hour, (period['end_time'] // 60) % 24 + 1):
-                hour_price = next(
-                    (p['SEK_per_kWh'] for p in prices['tomorrow'] if p['hour'] == hour % 24),
-                    None
-                )
-                if hour_price:
-                    new_prices.append(hour_price)
-        
-        if not new_prices:
+        new_avg_price = _average_period_price(new_discharging_periods, hourly_price_table(prices['tomorrow']))
+        if new_avg_price is None:
             return False  # No valid prices found for new periods
-            
-        new_avg_price = sum(new_prices) / len(new_prices)
 
         # Check if new prices exceed the threshold factor
         return new_avg_price >= (current_avg_price * self.price_threshold_factor)
@@ -148,7 +199,8 @@ class PeriodManager:
         hours_to_add: int, 
         current_periods: List[Dict],
         evening_prices: List[Dict],
-        hours_already_covered: float
+        hours_already_covered: float,
+        coverage_mask: Optional[int] = None
     ) -> List[Dict]:
         """
         Create new periods for evening optimization.
@@ -159,6 +211,7 @@ class PeriodManager:
             current_periods: Existing periods
             evening_prices: Evening price data
             hours_already_covered: Hours already covered in evening
+            coverage_mask: Bitmask of covered evening hours, if already computed by the caller
             
         Returns:
             List of new periods to add
@@ -167,49 +220,27 @@ class PeriodManager:
             return []
             
         # Get current day bit
-        current_day_bit = 1 << ((current_time.weekday() + 1) % 7)  # Sunday=0 convention
+        current_day_bit = get_day_bit(current_time)
         
-        # Get current hour coverage status
-        hours_coverage = {hour: False for hour in range(EVENING_START_HOUR, EVENING_END_HOUR)}
+        # Bitmask of evening hours already covered
+        coverage = coverage_mask
+        if coverage is None:
+            coverage = evening_coverage_mask(current_periods, current_day_bit)
         
-        for period in current_periods:
-            # Skip if not for today
-            if not (period['days'] & current_day_bit):
-                continue
-                
-            # Skip charging periods
-            if period['is_charging']:
-                continue
-                
-            # Convert to hours for comparison
-            start_hour = period['start_time'] // 60
-            end_hour = period['end_time'] // 60
-            
-            # Handle midnight crossing
-            if end_hour <= start_hour:
-                end_hour += 24
-                
-            # Mark which evening hours are covered
-            for hour in range(EVENING_START_HOUR, EVENING_END_HOUR):
-                if start_hour <= hour < end_hour:
-                    hours_coverage[hour] = True
-        
-        # Sort evening hours by price (highest first)
-        sorted_hours = sorted(
-            [(hour, next((p['SEK_per_kWh'] for p in evening_prices if p['hour'] == hour), 0)) 
-             for hour in range(EVENING_START_HOUR, EVENING_END_HOUR) if not hours_coverage[hour]],
-            key=lambda x: x[1],
-            reverse=True
+        # Take the top N uncovered evening hours by price (highest first) based on hours_to_add
+        price_by_hour = hourly_price_table(evening_prices, default=0)
+        best_hours = heapq.nlargest(
+            hours_to_add,
+            ((hour, price_by_hour[hour]) 
+             for hour in range(EVENING_START_HOUR, EVENING_END_HOUR) if not coverage >> hour & 1),
+            key=itemgetter(1)
         )
         
-        # Take the top N hours based on hours_to_add
-        best_hours = sorted_hours[:hours_to_add]
-        
         if not best_hours:
             return []
             
         # Sort by hour for period creation
-        best_hours.sort(key=lambda x: x[0])
+        best_hours.sort(key=itemgetter(0))
         
         # Create periods
         new_periods = []
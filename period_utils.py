@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Dict, Set
-from config import MAX_MINUTES
+from typing import Dict, List, Optional, Set
+from config import MAX_MINUTES, EVENING_START_HOUR, EVENING_END_HOUR
 
 def normalize_hour(hour: int) -> int:
     """Normalize hour to 0-23 range and handle midnight crossing"""
@@ -16,29 +16,80 @@ def is_day_hour(hour: int) -> bool:
     hour = normalize_hour(hour)
     return 7 <= hour <= 21
 
+# Hours 0-23 for which is_day_hour() is true
+DAY_HOURS = frozenset(h for h in range(24) if is_day_hour(h))
+
+# Day bit for each datetime.weekday() value (Monday=0), using the Sunday=bit 0 convention
+_DAY_BITS = (2, 4, 8, 16, 32, 64, 1)
+
+DAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+# Comma-separated day names for every 7-bit day mask (Sunday=bit 0)
+DAYS_STR = tuple(
+    ", ".join(name for i, name in enumerate(DAY_NAMES) if mask & (1 << i))
+    for mask in range(128)
+)
+
 def get_day_bit(date: datetime) -> int:
     """Convert date to day bit (Sunday=0 convention)."""
-    weekday = (date.weekday() + 1) % 7
-    return 1 << weekday
+    return _DAY_BITS[date.weekday()]
 
-def collect_period_hours(period: Dict) -> Set[int]:
-    """Collect hours from a period, handling midnight crossing."""
+def hourly_price_table(hour_prices: List[Dict], default: Optional[float] = None) -> List[Optional[float]]:
+    """
+    Flatten a day's price entries into a 24-slot list of SEK_per_kWh indexed by hour.
+    Hours without a price hold `default`; for repeated hours the first entry wins.
+    """
+    table = [default] * 24
+    for p in reversed(hour_prices):
+        table[p['hour']] = p['SEK_per_kWh']
+    return table
+
+def collect_period_hours_mask(period: Dict) -> int:
+    """Bitmask of hours (bit h for hour h, 0-23) covered by a period, handling midnight crossing."""
     start_hour = int(period['start_time'] // 60)
     end_hour = int(period['end_time'] // 60)
     
-    if end_hour <= start_hour:  # Midnight crossing
-        end_hour += 24
+    span = end_hour - start_hour if end_hour > start_hour else end_hour + 24 - start_hour
+    full = ((1 << span) - 1) << start_hour
+    # Fold hours past midnight back onto 0-23
+    return (full | (full >> 24)) & 0xFFFFFF
+
+def collect_period_hours(period: Dict) -> Set[int]:
+    """Collect hours from a period, handling midnight crossing."""
+    mask = collect_period_hours_mask(period)
+    return {h for h in range(24) if mask >> h & 1}
+
+def hour_mask(start_hour: int, end_hour: int) -> int:
+    """Bitmask with bit h set for each hour h in [start_hour, end_hour)."""
+    return ((1 << end_hour) - 1) ^ ((1 << start_hour) - 1)
+
+def evening_coverage_mask(periods: List[Dict], day_bit: int) -> int:
+    """Bitmask of evening hours covered by discharging periods on the given day."""
+    coverage = 0
+    for period in periods:
+        # Only discharging periods for this day count
+        if not (period['days'] & day_bit) or period['is_charging']:
+            continue
+            
+        start_hour = period['start_time'] // 60
+        end_hour = period['end_time'] // 60
         
-    return {h % 24 for h in range(start_hour, end_hour)}
+        # Handle midnight crossing
+        if end_hour <= start_hour:
+            end_hour += 24
+            
+        # Intersect with the evening window
+        lo = max(start_hour, EVENING_START_HOUR)
+        hi = min(end_hour, EVENING_END_HOUR)
+        if lo < hi:
+            coverage |= hour_mask(lo, hi)
+        
+    return coverage
 
 def validate_time(minutes: int) -> int:
     """Validate time is within bounds."""
     if not isinstance(minutes, int):
         raise ValueError("Time must be an integer number of minutes")
         
-    minutes = minutes % MAX_MINUTES
-    
-    if minutes < 0:
-        raise ValueError(f"Time cannot be negative")
-        
-    return minutes
\ No newline at end of file
+    # Python's % takes the sign of the divisor, so the result is always in [0, MAX_MINUTES)
+    return minutes % MAX_MINUTES
\ No newline at end of file
@@ -1,23 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import json
+import os
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
-from config import logger, STOCKHOLM_TZ, API_BASE_URL
+from config import logger, STOCKHOLM_TZ, API_BASE_URL, PRICE_CACHE_DIR
+
+def _parse_time_start(value: str, tz) -> datetime:
+    """Parse an API ISO 8601 timestamp and convert it to the given timezone."""
+    # Only rewrite a trailing 'Z', the API normally sends explicit offsets
+    if value[-1] == 'Z':
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value).astimezone(tz)
+
+def _date_key(date: datetime) -> str:
+    """Cache key (YYYY-MM-DD) for a market day."""
+    return f"{date.year}-{date.month:02d}-{date.day:02d}"
+
+def _prune_cache(cache: Dict[str, List[Dict]], oldest_key: str) -> None:
+    """Drop cached days before oldest_key; ISO date keys sort chronologically."""
+    for key in [key for key in cache if key < oldest_key]:
+        del cache[key]
+
+# Days of price files kept on disk; only today and tomorrow are ever requested
+CACHE_RETENTION_DAYS = 2
 
 class PriceFetcher:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = PRICE_CACHE_DIR):
         self.base_url = API_BASE_URL
         self.stockholm_tz = STOCKHOLM_TZ
+        self.cache_dir = cache_dir
+        # Published prices for a date never change, so successful responses are kept in memory
+        self._memory_cache: Dict[str, List[Dict]] = {}
+        # Hourly entries parsed from _memory_cache, so retries within a day skip re-parsing
+        self._processed_cache: Dict[str, List[Dict]] = {}
+        # Reuse connections (keep-alive) across requests instead of a new TLS handshake per fetch.
+        # Both fetch workers share it for plain GETs; urllib3's pool is thread-safe and keeps a connection per worker
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.headers.update({'Accept-Encoding': 'gzip'})
+
+    def _cache_path(self, cache_key: str) -> Optional[str]:
+        """Path of the on-disk cache file for a date, or None if disk caching is disabled."""
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{cache_key}_SE3.json")
+
+    def _read_cache(self, cache_key: str) -> Optional[List[Dict]]:
+        """Return cached price data for a date from memory or disk."""
+        data = self._memory_cache.get(cache_key)
+        if data is not None:
+            return data
+            
+        path = self._cache_path(cache_key)
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+            
+        self._memory_cache[cache_key] = data
+        return data
+
+    def _write_cache(self, cache_key: str, data: List[Dict]) -> None:
+        """Store price data for a date in memory and on disk."""
+        self._memory_cache[cache_key] = data
+        
+        path = self._cache_path(cache_key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write price cache {path}: {e}")
+            return
+        
+        self._prune_disk_cache(cache_key)
+
+    def _prune_disk_cache(self, newest_key: str) -> None:
+        """Delete cached price files more than CACHE_RETENTION_DAYS days older than newest_key."""
+        oldest = datetime.strptime(newest_key, '%Y-%m-%d') - timedelta(days=CACHE_RETENTION_DAYS)
+        oldest_key = _date_key(oldest)
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+            
+        for name in names:
+            # File names start with the ISO date key, which sorts chronologically
+            if name.endswith('_SE3.json') and name[:10] < oldest_key:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError as e:
+                    logger.warning(f"Could not remove old price cache {name}: {e}")
 
     def _fetch_price_data(self, date: datetime) -> Optional[List[Dict]]:
-        """Fetch price data for a specific date."""
+        """Fetch price data for a specific date, using the cache when available."""
+        cache_key = _date_key(date)
+        data = self._read_cache(cache_key)
+        if data is not None:
+            return data
+            
         try:
             url = f"{self.base_url}/{date.year}/{date.month:02d}-{date.day:02d}_SE3.json"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
-            return response.json()
+            data = response.json()
         except requests.RequestException as e:
             logger.error(f"Error fetching prices for {date.date()}: {e}")
             return None
+            
+        if data:
+            self._write_cache(cache_key, data)
+        return data
+
+    def _process_day(self, raw_prices: List[Dict]) -> List[Dict]:
+        """Convert one day of API price data to hourly entries sorted by hour."""
+        tz = self.stockholm_tz
+        processed = []
+        for item in raw_prices:
+            time_start = _parse_time_start(item['time_start'], tz)
+            
+            processed.append({
+                'hour': time_start.hour,
+                'time_start': time_start,
+                'SEK_per_kWh': item['SEK_per_kWh']
+            })
+        # The API returns hours in order, which makes this sort a single linear pass
+        processed.sort(key=itemgetter('hour'))
+        return processed
+
+    def _get_day_prices(self, date: datetime) -> Optional[List[Dict]]:
+        """Hourly prices for a date, fetched and parsed at most once per process."""
+        cache_key = _date_key(date)
+        prices = self._processed_cache.get(cache_key)
+        if prices is not None:
+            return prices
+            
+        data = self._fetch_price_data(date)
+        if not data:
+            return None
+            
+        prices = self._process_day(data)
+        self._processed_cache[cache_key] = prices
+        return prices
 
     def get_prices(self) -> Dict[str, List[Dict]]:
         """Get electricity prices for today and tomorrow."""
@@ -25,35 +159,24 @@ class PriceFetcher:
         today = now
         tomorrow = now + timedelta(days=1)
         
-        today_data = self._fetch_price_data(today)
-        tomorrow_data = self._fetch_price_data(tomorrow)
+        # Past days are never requested again, keep the per-process caches from growing
+        today_key = _date_key(today)
+        _prune_cache(self._memory_cache, today_key)
+        _prune_cache(self._processed_cache, today_key)
+        
+        # Fetch both days concurrently, the requests are independent and network bound
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            today_future = executor.submit(self._get_day_prices, today)
+            tomorrow_future = executor.submit(self._get_day_prices, tomorrow)
+            today_prices = today_future.result()
+            tomorrow_prices = tomorrow_future.result()
         
         result = {}
         
-        if today_data:
-            processed_today = []
-            for item in today_data:
-                time_start = datetime.fromisoformat(item['time_start'].replace('Z', '+00:00'))
-                time_start = time_start.astimezone(self.stockholm_tz)
-                
-                processed_today.append({
-                    'hour': time_start.hour,
-                    'time_start': time_start,
-                    'SEK_per_kWh': item['SEK_per_kWh']
-                })
-            result['today'] = sorted(processed_today, key=lambda x: x['hour'])
-            
-        if tomorrow_data:
-            processed_tomorrow = []
-            for item in tomorrow_data:
-                time_start = datetime.fromisoformat(item['time_start'].replace('Z', '+00:00'))
-                time_start = time_start.astimezone(self.stockholm_tz)
-                
-                processed_tomorrow.append({
-                    'hour': time_start.hour,
-                    'time_start': time_start,
-                    'SEK_per_kWh': item['SEK_per_kWh']
-                })
-            result['tomorrow'] = sorted(processed_tomorrow, key=lambda x: x['hour'])
-            
-        return result
\ No newline at end of file
+        if today_prices:
+            result['today'] = today_prices
+            
+        if tomorrow_prices:
+            result['tomorrow'] = tomorrow_prices
+            
+        return result
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 import logging
+from contextlib import closing
+import struct
 import sys
 from pymodbus.client import ModbusTcpClient
-from datetime import datetime
-import pytz
+from typing import List, Optional, Tuple
 
 # Configure logging to console only for this simple script
 logging.basicConfig(
@@ -13,25 +14,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Active day indices (0=Sunday .. 6=Saturday) for every 7-bit day mask
+_DAYS_LUT = tuple(tuple(i for i in range(7) if days_bits & (1 << i)) for days_bits in range(128))
+
+_WEEKDAYS = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+# Comma-separated day names for every 7-bit day mask
+_DAYS_STR_LUT = tuple(", ".join(_WEEKDAYS[i] for i in days) for days in _DAYS_LUT)
+
+_INT32 = struct.Struct('>i')
+_TWO_REGS = struct.Struct('>HH')
+
+def regs_to_int32(registers: List[int]) -> int:
+    """Combine two 16-bit registers (high word first) into a signed 32-bit integer."""
+    return _INT32.unpack(_TWO_REGS.pack(registers[0], registers[1]))[0]
+
+def decode_periods(data: List[int]) -> List[Tuple[int, int, int]]:
+    """
+    Split raw Time of Use register data into one tuple per configured period.
+    Each period takes 3 values: start_time and end_time in minutes since
+    midnight, and the combined charge/discharge and days flags.
+    Periods truncated by the end of the data are dropped.
+    """
+    end_idx = 1 + data[0] * 3
+    return list(zip(data[1:end_idx:3], data[2:end_idx:3], data[3:end_idx:3]))
+
 def parse_period_flags(flag_value: int) -> tuple:
     """
     Parse the combined charging/day flags.
-    Returns (is_charging: bool, active_days: list[int])
+    Returns (is_charging: bool, active_days: tuple[int, ...])
     """
     # Bit 8 (256) determines charging (0) or discharging (1)
     is_charging = (flag_value & 256) == 0
     
     # Lower 7 bits (0-6) represent days (Sunday to Saturday)
-    days_bits = flag_value & 0x7F  # Get only the lower 7 bits
-    
-    active_days = []
-    for i in range(7):
-        if days_bits & (1 << i):
-            active_days.append(i)
+    active_days = _DAYS_LUT[flag_value & 0x7F]
             
     return is_charging, active_days
 
-def read_active_power(host: str, port: int = 502):
+def read_active_power(host: str, port: int = 502, client: Optional[ModbusTcpClient] = None):
     """
     Read active power from Luna2000 battery.
     
@@ -39,12 +59,14 @@ def read_active_power(host: str, port: int = 502):
     Positive values indicate feed-in to the power grid.
     Negative values indicate supply from the power grid.
     """
+    # Reuse the caller's connection if one is given
+    own_client = client is None
     try:
-        # Connect to battery
-        client = ModbusTcpClient(host)
-        if not client.connect():
-            logger.error("Failed to connect to battery")
-            return False
+        if own_client:
+            client = ModbusTcpClient(host)
+            if not client.connect():
+                logger.error("Failed to connect to battery")
+                return False
 
         # Read register (37113 is the Active Power register)
         # Quantity is 2 because it's a 32-bit value
@@ -63,11 +85,7 @@ def read_active_power(host: str, port: int = 502):
         
         # Convert two 16-bit registers to one 32-bit signed integer
         # First register is high word, second register is low word
-        active_power = (data[0] << 16) | data[1]
-        
-        # Convert to signed value if necessary (two's complement)
-        if active_power >= 2**31:
-            active_power = active_power - 2**32
+        active_power = regs_to_int32(data)
             
         # Apply gain (which is 1 in this case)
         # If gain were different, we'd multiply here
@@ -91,19 +109,21 @@ def read_active_power(host: str, port: int = 502):
         return False
     
     finally:
-        if 'client' in locals():
+        if own_client and client:
             client.close()
 
     return True
 
-def read_battery_schedule(host: str, port: int = 502):
+def read_battery_schedule(host: str, port: int = 502, client: Optional[ModbusTcpClient] = None):
     """Read and display the current schedule from Luna2000 battery."""
+    # Reuse the caller's connection if one is given
+    own_client = client is None
     try:
-        # Connect to battery
-        client = ModbusTcpClient(host)
-        if not client.connect():
-            logger.error("Failed to connect to battery")
-            return False
+        if own_client:
+            client = ModbusTcpClient(host)
+            if not client.connect():
+                logger.error("Failed to connect to battery")
+                return False
 
         # Read register (47255 is the Time of Use register)
         response = client.read_holding_registers(
@@ -128,44 +148,34 @@ def read_battery_schedule(host: str, port: int = 502):
             return True
 
         # Print each period
-        weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
         logger.info("\nSchedule details:")
         logger.info("=" * 50)
 
-        for i in range(num_periods):
-            # Each period takes 3 values: start_time, end_time, flags
-            base_idx = 1 + (i * 3)
-            if base_idx + 2 >= len(data):
-                break
-
-            start_time = data[base_idx]     # Minutes since midnight
-            end_time = data[base_idx + 1]   # Minutes since midnight
-            period_flags = data[base_idx + 2]  # Combined charge/discharge and days flags
+        for i, (start_time, end_time, period_flags) in enumerate(decode_periods(data)):
 
             # Validate time range
             if not (0 <= start_time <= 1440 and 0 <= end_time <= 1440):
                 logger.warning(f"Invalid time range in period {i + 1}")
                 continue
 
-            # Parse the combined flags
-            is_charging, active_day_indices = parse_period_flags(period_flags)
+            # Bit 8 (256) determines charging (0) or discharging (1); the days are shown from the LUT below
+            is_charging = (period_flags & 256) == 0
 
             # Convert minutes to hours:minutes format
-            start_hour = start_time // 60
-            start_minute = start_time % 60
-            end_hour = end_time // 60
-            end_minute = end_time % 60
+            start_hour, start_minute = divmod(start_time, 60)
+            end_hour, end_minute = divmod(end_time, 60)
 
             # Get days this period applies to
-            active_days = [weekdays[idx] for idx in active_day_indices]
-            days_str = ", ".join(active_days)
+            days_str = _DAYS_STR_LUT[period_flags & 0x7F]
 
-            # Print period details
-            logger.info(f"\nPeriod {i + 1}:")
-            logger.info(f"  Time: {start_hour:02d}:{start_minute:02d} - {end_hour:02d}:{end_minute:02d}")
-            logger.info(f"  Mode: {'Charging' if is_charging else 'Discharging'}")
-            logger.info(f"  Active days: {days_str}")
-            logger.info(f"  Raw flags value: {period_flags}")
+            # Print period details as a single log record
+            logger.info("\n".join((
+                f"\nPeriod {i + 1}:",
+                f"  Time: {start_hour:02d}:{start_minute:02d} - {end_hour:02d}:{end_minute:02d}",
+                f"  Mode: {'Charging' if is_charging else 'Discharging'}",
+                f"  Active days: {days_str}",
+                f"  Raw flags value: {period_flags}"
+            )))
 
         logger.info("\nRaw register data:")
         logger.info(f"  {data}")
@@ -175,19 +185,21 @@ def read_battery_schedule(host: str, port: int = 502):
         return False
     
     finally:
-        if 'client' in locals():
+        if own_client and client:
             client.close()
 
     return True
 
-def read_battery_soc(host: str, port: int = 502):
+def read_battery_soc(host: str, port: int = 502, client: Optional[ModbusTcpClient] = None):
     """Read and display the soc from Luna2000 battery."""
+    # Reuse the caller's connection if one is given
+    own_client = client is None
     try:
-        # Connect to battery
-        client = ModbusTcpClient(host)
-        if not client.connect():
-            logger.error("Failed to connect to battery")
-            return False
+        if own_client:
+            client = ModbusTcpClient(host)
+            if not client.connect():
+                logger.error("Failed to connect to battery")
+                return False
 
         # Read register (47255 is the Time of Use register)
         response = client.read_holding_registers(
@@ -211,19 +223,21 @@ def read_battery_soc(host: str, port: int = 502):
         return False
     
     finally:
-        if 'client' in locals():
+        if own_client and client:
             client.close()
 
     return True
 
-def read_working_mode(host: str, port: int = 502):
+def read_working_mode(host: str, port: int = 502, client: Optional[ModbusTcpClient] = None):
     """Read and display working mode from Luna2000 battery."""
+    # Reuse the caller's connection if one is given
+    own_client = client is None
     try:
-        # Connect to battery
-        client = ModbusTcpClient(host)
-        if not client.connect():
-            logger.error("Failed to connect to battery")
-            return False
+        if own_client:
+            client = ModbusTcpClient(host)
+            if not client.connect():
+                logger.error("Failed to connect to battery")
+                return False
 
         response = client.read_holding_registers(
             address=47086,
@@ -247,7 +261,7 @@ def read_working_mode(host: str, port: int = 502):
         return False
     
     finally:
-        if 'client' in locals():
+        if own_client and client:
             client.close()
 
     return True
@@ -256,26 +270,34 @@ def main():
     # Replace with your battery's IP address
     BATTERY_HOST = "192.168.20.194"
     
-    # logger.info(f"Reading schedule from Luna2000 battery at {BATTERY_HOST}")
-    # success = read_battery_schedule(BATTERY_HOST)
+    # Open one connection and reuse it for every read instead of reconnecting per register
+    # The registers are too far apart to batch: a Modbus read is limited to 125 registers,
+    # while 37113-37760 and 47086-47297 span 648 and 212 registers respectively
+    with closing(ModbusTcpClient(BATTERY_HOST)) as client:
+        if not client.connect():
+            logger.error("Failed to connect to battery")
+            sys.exit(1)
+        
+        # logger.info(f"Reading schedule from Luna2000 battery at {BATTERY_HOST}")
+        # success = read_battery_schedule(BATTERY_HOST, client=client)
 
-    # if not success:
-    #     sys.exit(1)
+        # if not success:
+        #     sys.exit(1)
 
-    # logger.info(f"Reading SOC from Luna2000 battery at {BATTERY_HOST}")
-    # success = read_battery_soc(BATTERY_HOST)
+        # logger.info(f"Reading SOC from Luna2000 battery at {BATTERY_HOST}")
+        # success = read_battery_soc(BATTERY_HOST, client=client)
 
-    # if not success:
-    #     sys.exit(1)
-    
-    # logger.info(f"Reading active power from Luna2000 battery at {BATTERY_HOST}")
-    # success = read_active_power(BATTERY_HOST)
+        # if not success:
+        #     sys.exit(1)
+        
+        # logger.info(f"Reading active power from Luna2000 battery at {BATTERY_HOST}")
+        # success = read_active_power(BATTERY_HOST, client=client)
 
-    # if not success:
-    #     sys.exit(1)
+        # if not success:
+        #     sys.exit(1)
 
-    logger.info(f"Reading working mode from Luna2000 battery at {BATTERY_HOST}")
-    success = read_working_mode(BATTERY_HOST)
+        logger.info(f"Reading working mode from Luna2000 battery at {BATTERY_HOST}")
+        success = read_working_mode(BATTERY_HOST, client=client)
 
     if not success:
         sys.exit(1)
@@ -1,8 +1,13 @@
 # register_debug.py
-from typing import List, Dict
-from datetime import datetime
-import pytz
-from config import STOCKHOLM_TZ
+import sys
+from typing import List
+
+_WEEKDAYS = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+# Comma-separated day names for every 7-bit day mask
+_DAYS_STR_LUT = tuple(
+    ", ".join(day for j, day in enumerate(_WEEKDAYS) if days_bits & (1 << j))
+    for days_bits in range(128)
+)
 
 def print_register_data(register_data: List[int], title: str = "Register Data") -> None:
     """
@@ -12,19 +17,19 @@ def print_register_data(register_data: List[int], title: str = "Register Data")
         register_data: List of 43 integers representing the battery schedule
         title: Optional title for the output
     """
-    print(f"\n{'='*50}")
-    print(f"=== {title} ===")
-    print(f"{'='*50}")
+    # Collect the output and write it in one go instead of a print() per line
+    lines = []
+    out = lines.append
+    out(f"\n{'='*50}")
+    out(f"=== {title} ===")
+    out(f"{'='*50}")
     
     num_periods = int(register_data[0])
-    print(f"\nNumber of periods: {num_periods}")
+    out(f"\nNumber of periods: {num_periods}")
     
     if num_periods > 0:
-        print("\nPeriod details:")
-        print("-" * 50)
-        
-        weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 
-                   'Thursday', 'Friday', 'Saturday']
+        out("\nPeriod details:")
+        out("-" * 50)
         
         for i in range(num_periods):
             base_idx = 1 + (i * 4)
@@ -43,24 +48,25 @@ def print_register_data(register_data: List[int], title: str = "Register Data")
                 end_hour += 24
                 
             # Get active days
-            active_days = [weekdays[j] for j in range(7) if days_bits & (1 << j)]
-            days_str = ", ".join(active_days)
+            days_str = _DAYS_STR_LUT[days_bits & 0x7F]
             
             # Determine if charging or discharging
             mode = "Charging" if charge_flag == 0 else "Discharging"
             
-            print(f"Period {i+1}:")
-            print(f"  Mode: {mode}")
-            print(f"  Time: {start_hour%24:02d}:00-{end_hour%24:02d}:00")
-            print(f"  Days: {days_str}")
-            print(f"  Raw values: start={start_minutes}, end={end_minutes}, "
-                  f"charge_flag={charge_flag}, days_bits={days_bits}")
-            print()
+            out(f"Period {i+1}:")
+            out(f"  Mode: {mode}")
+            out(f"  Time: {start_hour%24:02d}:00-{end_hour%24:02d}:00")
+            out(f"  Days: {days_str}")
+            out(f"  Raw values: start={start_minutes}, end={end_minutes}, "
+                f"charge_flag={charge_flag}, days_bits={days_bits}")
+            out("")
     
-    print("\nComplete register data:")
-    print("-" * 50)
-    print(f"[{', '.join(str(x) for x in register_data)}]")
-    print("=" * 50)
+    out("\nComplete register data:")
+    out("-" * 50)
+    out(repr(list(register_data)))
+    out("=" * 50)
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def format_time_range(start_minutes: int, end_minutes: int) -> str:
     """Format a time range in a human-readable format."""
@@ -84,26 +90,30 @@ def verify_register_data(register_data: List[int]) -> bool:
         
     Prints detailed verification results
     """
-    print("\nVerifying register data...")
+    # Collect the output and write it in one go instead of a print() per line
+    lines = []
+    out = lines.append
+    out("\nVerifying register data...")
     valid = True
     
     # Check length
     if len(register_data) != 43:
-        print(f"❌ Invalid length: {len(register_data)} (should be 43)")
+        out(f"❌ Invalid length: {len(register_data)} (should be 43)")
+        sys.stdout.write("\n".join(lines) + "\n")
         return False
         
     num_periods = register_data[0]
-    print(f"\nNumber of periods: {num_periods}")
+    out(f"\nNumber of periods: {num_periods}")
     
     if num_periods < 0 or num_periods > 14:
-        print(f"❌ Invalid number of periods: {num_periods} (should be 0-14)")
+        out(f"❌ Invalid number of periods: {num_periods} (should be 0-14)")
         valid = False
         
     # Check each period
     for i in range(num_periods):
         base_idx = 1 + (i * 4)
         if base_idx + 3 >= len(register_data):
-            print(f"❌ Period {i+1} data extends beyond register length")
+            out(f"❌ Period {i+1} data extends beyond register length")
             valid = False
             continue
             
@@ -112,50 +122,49 @@ def verify_register_data(register_data: List[int]) -> bool:
         charge_flag = register_data[base_idx + 2]
         days_bits = register_data[base_idx + 3]
         
-        print(f"\nPeriod {i+1}:")
+        out(f"\nPeriod {i+1}:")
         
         # Verify time values
         if not (0 <= start_minutes < 1440):
-            print(f"❌ Invalid start time: {start_minutes} minutes")
+            out(f"❌ Invalid start time: {start_minutes} minutes")
             valid = False
         else:
-            print(f"✓ Start time valid: {start_minutes} minutes "
-                  f"({start_minutes//60:02d}:00)")
+            out(f"✓ Start time valid: {start_minutes} minutes "
+                f"({start_minutes//60:02d}:00)")
             
         if not (0 < end_minutes <= 1440):
-            print(f"❌ Invalid end time: {end_minutes} minutes")
+            out(f"❌ Invalid end time: {end_minutes} minutes")
             valid = False
         else:
-            print(f"✓ End time valid: {end_minutes} minutes "
-                  f"({end_minutes//60:02d}:00)")
+            out(f"✓ End time valid: {end_minutes} minutes "
+                f"({end_minutes//60:02d}:00)")
             
         # Verify charge flag
         if charge_flag not in [0, 1]:
-            print(f"❌ Invalid charge flag: {charge_flag}")
+            out(f"❌ Invalid charge flag: {charge_flag}")
             valid = False
         else:
-            print(f"✓ Charge flag valid: {charge_flag} "
-                  f"({'Charging' if charge_flag == 0 else 'Discharging'})")
+            out(f"✓ Charge flag valid: {charge_flag} "
+                f"({'Charging' if charge_flag == 0 else 'Discharging'})")
             
         # Verify day bits
         if not (0 < days_bits < 128):
-            print(f"❌ Invalid days bits: {days_bits}")
+            out(f"❌ Invalid days bits: {days_bits}")
             valid = False
         else:
-            weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 
-                       'Thursday', 'Friday', 'Saturday']
-            active_days = [weekdays[j] for j in range(7) if days_bits & (1 << j)]
-            print(f"✓ Days bits valid: {days_bits} ({', '.join(active_days)})")
+            out(f"✓ Days bits valid: {days_bits} ({_DAYS_STR_LUT[days_bits]})")
     
     # Check padding
     remaining_values = register_data[1 + num_periods*4:]
     if not all(x == 0 for x in remaining_values):
-        print("\n❌ Non-zero values in padding area")
+        out("\n❌ Non-zero values in padding area")
         valid = False
     else:
-        print("\n✓ Padding area correctly zeroed")
+        out("\n✓ Padding area correctly zeroed")
+    
+    out(f"\nVerification {'passed' if valid else 'failed'} ✓" if valid else "❌")
     
-    print(f"\nVerification {'passed' if valid else 'failed'} ✓" if valid else "❌")
+    sys.stdout.write("\n".join(lines) + "\n")
     return valid
 
 if __name__ == "__main__":
@@ -1,80 +1,83 @@
 #!/usr/bin/env python3
-import schedule
-import time
-import subprocess
-import sys
+import asyncio
+import heapq
 import os
+import sys
 import argparse
-from datetime import datetime
-import pytz
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 import signal
 from config import logger
-
-# Get the directory where this script is located
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-BATTERY_SCRIPT = os.path.join(SCRIPT_DIR, 'set_battery_schedule.py')
+from set_battery_schedule import run as run_schedule_update
 
 # Flag to track if shutdown is requested
 shutdown_requested = False
+# Set alongside the flag to wake the scheduler loop; only exists while it runs
+shutdown_event = None
+
+# Daily ("HH:MM", mode) runs, in local time
+SCHEDULED_RUNS = (
+    ("14:00", "regular"),
+    ("17:00", "evening"),
+)
+
+# Upper bound on a single idle sleep, so clock adjustments are picked up
+MAX_IDLE_SLEEP = 60
 
 def run_battery_schedule(mode):
-    """Run the battery schedule script with the specified mode."""
+    """Run a battery schedule update in the specified mode."""
     start_time = datetime.now()
     logger.info(f"Starting battery schedule in {mode} mode at {start_time}")
     
     try:
-        # Build the command
-        cmd = [sys.executable, BATTERY_SCRIPT, '--mode', mode]
-        
-        # Log the command being run
-        logger.info(f"Executing: {' '.join(cmd)}")
-        
-        # Run the command and capture output
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False  # Don't raise exception on non-zero return code
-        )
+        # Run the update in this process; it logs through the same logger
+        returncode = run_schedule_update(mode)
         
         # Log the result
-        if result.returncode == 0:
+        if returncode == 0:
             logger.info(f"{mode.capitalize()} schedule completed successfully")
         else:
-            logger.error(f"{mode.capitalize()} schedule failed with return code {result.returncode}")
-            logger.error(f"Error output: {result.stderr}")
-        
-        # Log stdout for debugging
-        for line in result.stdout.splitlines():
-            logger.debug(f"STDOUT: {line}")
+            logger.error(f"{mode.capitalize()} schedule failed with return code {returncode}")
         
         # Calculate execution time
         execution_time = (datetime.now() - start_time).total_seconds()
         logger.info(f"{mode.capitalize()} schedule execution completed in {execution_time:.2f} seconds")
         
-        return result.returncode == 0
+        return returncode == 0
     
     except Exception as e:
         logger.error(f"Error executing {mode} schedule: {e}")
         return False
 
-def setup_schedule():
-    """Set up the daily schedule."""
-    logger.info("Setting up battery schedule automation")
+def next_run_time(at: str, now: Optional[datetime] = None) -> datetime:
+    """Next local time matching "HH:MM": today if it is still ahead, otherwise tomorrow."""
+    now = now or datetime.now()
+    hour, minute = map(int, at.split(':'))
     
-    # Schedule regular mode at 14:00
-    schedule.every().day.at("14:00").do(run_battery_schedule, mode="regular")
-    logger.info("Scheduled regular battery update at 14:00 daily")
+    run_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run_time <= now:
+        run_time += timedelta(days=1)
+    return run_time
+
+def setup_schedule() -> List[Tuple[datetime, str, str]]:
+    """
+    Set up the daily schedule.
     
-    # Schedule evening mode at 17:00
-    schedule.every().day.at("17:00").do(run_battery_schedule, mode="evening")
-    logger.info("Scheduled evening battery update at 17:00 daily")
+    Returns:
+        Heap of (next run time, "HH:MM", mode) entries, earliest run first
+    """
+    logger.info("Setting up battery schedule automation")
+    
+    jobs = []
+    for at, mode in SCHEDULED_RUNS:
+        heapq.heappush(jobs, (next_run_time(at), at, mode))
+        logger.info(f"Scheduled {mode} battery update at {at} daily")
     
     # Log next scheduled runs
-    for job in schedule.get_jobs():
-        next_run = job.next_run
-        if next_run:
-            logger.info(f"Next scheduled run: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+    for next_run, _, _ in sorted(jobs):
+        logger.info(f"Next scheduled run: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    return jobs
 
 def run_now(mode):
     """Run the specified mode immediately."""
@@ -87,10 +90,40 @@ def signal_handler(signum, frame):
     
     if shutdown_requested:
         logger.info("Forced shutdown requested. Exiting immediately.")
-        sys.exit(1)
+        # sys.exit would wait for an update still running in an executor thread
+        os._exit(1)
     
     logger.info(f"Signal {signum} received. Preparing for graceful shutdown...")
     shutdown_requested = True
+    if shutdown_event is not None:
+        shutdown_event.set()
+
+async def run_scheduler(jobs: List[Tuple[datetime, str, str]]):
+    """Run jobs as they come due, sleeping until the next one or until shutdown is requested."""
+    global shutdown_event
+    
+    shutdown_event = asyncio.Event()
+    
+    # Deliver signals through the event loop so they wake the sleep immediately
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig, None)
+    
+    while not shutdown_requested and jobs:
+        next_run, at, mode = jobs[0]
+        idle = (next_run - datetime.now()).total_seconds()
+        
+        if idle > 0:
+            try:
+                await asyncio.wait_for(shutdown_event.wait(), timeout=min(idle, MAX_IDLE_SLEEP))
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        # The update blocks on Modbus and HTTP, so run it in a worker thread to keep signals responsive
+        await loop.run_in_executor(None, run_battery_schedule, mode)
+        # Reschedule from the wall clock, so a long run or a DST change doesn't shift the job
+        heapq.heapreplace(jobs, (next_run_time(at), at, mode))
 
 def main():
     """Main function."""
@@ -102,12 +135,12 @@ def main():
     
     args = parser.parse_args()
     
-    # Set up signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     # Check if we're running in immediate mode
     if args.run_now:
+        # Set up signal handlers for graceful shutdown; the scheduler loop registers its own on the event loop
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        
         if args.run_now == 'both':
             logger.info("Running both regular and evening modes immediately")
             regular_success = run_battery_schedule('regular')
@@ -130,14 +163,12 @@ def main():
         logger.info("Could not import timezone from config, using system timezone")
     
     # Set up the schedule
-    setup_schedule()
+    jobs = setup_schedule()
     
     # Main loop to run pending tasks
     logger.info("Entering main scheduler loop. Press Ctrl+C to exit.")
     try:
-        while not shutdown_requested:
-            schedule.run_pending()
-            time.sleep(1)
+        asyncio.run(run_scheduler(jobs))
     except Exception as e:
         logger.error(f"Error in main loop: {e}")
     finally:
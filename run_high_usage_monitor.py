@@ -2,7 +2,6 @@
 import asyncio
 import signal
 import sys
-import time
 import os
 import logging
 from datetime import datetime
@@ -16,16 +15,20 @@ monitor = None
 session = None
 websession = None
 shutdown_in_progress = False
+# Set by the first shutdown signal, before cleanup starts
+shutdown_requested = False
+
+# Seconds the cleanup may take after a shutdown signal before the process is forced to exit
+SHUTDOWN_GRACE_PERIOD = 10.0
 
 async def create_monitor(test_mode=False):
     """Create and initialize the high usage monitor."""
-    from high_usage_monitor import HighUsageMonitor
+    from high_usage_monitor import HighUsageMonitor, create_websession
     global monitor, session, websession
     
     try:
         # We'll manage our own aiohttp session for better control
-        import aiohttp
-        websession = aiohttp.ClientSession()
+        websession = create_websession()
         
         # Create the monitor with our managed session
         monitor = HighUsageMonitor(test_mode=test_mode, websession=websession)
@@ -137,6 +140,11 @@ async def main():
     logger.info("Starting Battery Management System")
     logger.info("Starting high usage monitor service")
     
+    # Register signal handlers for graceful shutdown; they run on the event loop, between tasks
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, signal_handler, sig)
+    
     try:
         # Initialize the monitor
         success = await create_monitor(test_mode=False)
@@ -156,41 +164,42 @@ async def main():
         logger.error(f"Unexpected error in main: {e}")
         return 1
     finally:
-        # Ensure cleanup happens
-        await cleanup_resources()
+        # Ensure cleanup happens, but don't let a hung close block the exit
+        try:
+            await asyncio.wait_for(cleanup_resources(), timeout=SHUTDOWN_GRACE_PERIOD)
+        except asyncio.TimeoutError:
+            logger.warning("Cleanup did not finish within the grace period, forcing exit")
+            os._exit(1)
     
     return 0
 
-def signal_handler(sig, frame):
+async def shutdown():
+    """Cancel the running tasks so that main() cleans up on the event loop."""
+    current = asyncio.current_task()
+    for task in asyncio.all_tasks():
+        if task is not current:
+            task.cancel()
+
+def signal_handler(sig):
     """Handle interrupt signals."""
-    global shutdown_in_progress
+    global shutdown_requested
     
-    if shutdown_in_progress:
+    # A second signal must not start another shutdown(), which would cancel the cleanup in main()
+    if shutdown_requested or shutdown_in_progress:
         logger.info("Shutdown already in progress, forcing exit...")
         os._exit(1)  # Force exit if called twice
         
-    logger.info("Shutdown signal received")
-    
-    # Get the current event loop
-    loop = asyncio.get_event_loop()
+    shutdown_requested = True
+    logger.info(f"Shutdown signal {sig} received")
     
-    # Schedule the cleanup
-    for task in asyncio.all_tasks(loop):
-        if task != asyncio.current_task():
-            task.cancel()
-    
-    # Schedule cleanup
-    loop.create_task(cleanup_resources())
+    # Cancel from a task of its own, so the current task is well defined
+    asyncio.create_task(shutdown())
 
 if __name__ == "__main__":
     # Configure default exception handler
     def handle_exception(loop, context):
         logger.error(f"Unhandled exception: {context}")
     
-    # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
     # Run the main function
     try:
         loop = asyncio.get_event_loop()
@@ -1,13 +1,17 @@
-from typing import Dict, List
+import logging
+from typing import Dict, List, Tuple
+from operator import itemgetter
 from datetime import datetime
 from config import logger
-from period_utils import get_day_bit
+from period_utils import DAYS_STR, get_day_bit
 from period_manager import PeriodManager
 
 class ScheduleDataManager:
     def __init__(self, max_periods: int):
         self.MAX_PERIODS = max_periods
         self.period_manager = PeriodManager()
+        # Formatted log_schedule descriptions keyed on (start_time, end_time, days, is_charging)
+        self._period_text_cache: Dict[Tuple[int, int, int, bool], str] = {}
 
     def clean_schedule(self, schedule: Dict, current_date: datetime) -> List[Dict]:
         """Remove periods that aren't for the current day or have already passed."""
@@ -15,56 +19,68 @@ class ScheduleDataManager:
             return []
             
         current_day_bit = get_day_bit(current_date)
+        # Same test as PeriodManager.is_period_in_future, with the current minute computed once
+        current_minutes = current_date.hour * 60 + current_date.minute
         
         return [p for p in schedule['periods'] 
                 if (p['days'] & current_day_bit) and 
-                   PeriodManager().is_period_in_future(p, current_date)]
+                   p['start_time'] > current_minutes]
 
-    def create_register_data(self, periods: List[Dict]) -> List[int]:
-        """Create register data format from periods."""
+    def create_register_data(self, periods: List[Dict], assume_sorted: bool = False) -> List[int]:
+        """
+        Create register data format from periods.
+        
+        Args:
+            periods: Periods to write, at most MAX_PERIODS
+            assume_sorted: Periods are already in start_time order, skip sorting them
+        """
         if len(periods) > self.MAX_PERIODS:
             raise ValueError(f"Maximum {self.MAX_PERIODS} periods allowed")
             
-        data = [len(periods)]  # Number of periods
+        # Fixed 43-value layout: period count, then start, end and flags per period, zero padded
+        data = [0] * 43
+        data[0] = len(periods)  # Number of periods
         
-        for period in sorted(periods, key=lambda x: x['start_time']):
-            combined_flags = self._combine_flags(
-                charge_flag=0 if period['is_charging'] else 1,
-                days_bits=period['days']
-            )
+        base_idx = 1
+        if not assume_sorted:
+            periods = sorted(periods, key=itemgetter('start_time'))
             
-            data.extend([
-                period['start_time'],
-                period['end_time'],
-                combined_flags
-            ])
+        for period in periods:
+            data[base_idx] = period['start_time']
+            data[base_idx + 1] = period['end_time']
+            # Day bits, plus 256 for discharging
+            data[base_idx + 2] = period['days'] + (0 if period['is_charging'] else 256)
+            base_idx += 3
             
-        # Pad with zeros to reach 43 values
-        data.extend([0] * (43 - len(data)))
         return data
 
-    def _combine_flags(self, charge_flag: int, days_bits: int) -> int:
-        """Combine charge flag and day bits into single value."""
-        return days_bits + (256 if charge_flag == 1 else 0)
-
     def log_schedule(self, periods: List[Dict], title: str = "Schedule"):
         """Log schedule in human-readable format."""
-        weekdays = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 
-                   'Thursday', 'Friday', 'Saturday']
-        logger.info(f"\n=== {title} ===")
+        # Skip formatting every period when INFO records would be dropped anyway
+        if not logger.isEnabledFor(logging.INFO):
+            return
+            
+        log = logger.info
+        log(f"\n=== {title} ===")
         
+        text_cache = self._period_text_cache
         for i, period in enumerate(periods, 1):
-            active_days = [weekdays[i] for i in range(7) 
-                         if period['days'] & (1 << i)]
-            days_str = ", ".join(active_days)
-            start_hour = period['start_time'] // 60
-            end_hour = period['end_time'] // 60
-            mode = "Charging" if period['is_charging'] else "Discharging"
-            
-            if end_hour <= start_hour:
-                end_hour += 24
+            # The same periods show up in several of the logged schedules, format each only once
+            key = (period['start_time'], period['end_time'], period['days'], period['is_charging'])
+            text = text_cache.get(key)
+            if text is None:
+                text = text_cache[key] = self._format_period(period)
             
-            logger.info(
-                f"Period {i}: {mode} on {days_str} "
-                f"at {start_hour%24:02d}:00-{end_hour%24:02d}:00"
-            )
\ No newline at end of file
+            log(f"Period {i}: {text}")
+
+    def _format_period(self, period: Dict) -> str:
+        """Describe a period's mode, days and hours for log_schedule."""
+        days_str = DAYS_STR[period['days'] & 0x7F]
+        start_hour = period['start_time'] // 60
+        end_hour = period['end_time'] // 60
+        mode = "Charging" if period['is_charging'] else "Discharging"
+        
+        if end_hour <= start_hour:
+            end_hour += 24
+        
+        return f"{mode} on {days_str} at {start_hour%24:02d}:00-{end_hour%24:02d}:00"
@@ -11,6 +11,7 @@ from config import (
 from battery_manager import BatteryManager
 from optimization_manager import OptimizationManager
 from period_manager import PeriodManager
+from period_utils import get_day_bit
 from price_fetcher import PriceFetcher
 from schedule_data_manager import ScheduleDataManager
 
@@ -26,6 +27,23 @@ class ScheduleManager:
         )
         self.stockholm_tz = STOCKHOLM_TZ
 
+    def _write_schedule_if_changed(self, new_register_data: List[int], current_schedule: Dict) -> bool:
+        """
+        Write register data to the battery unless it matches what the battery already holds.
+        
+        Args:
+            new_register_data: Register data to write
+            current_schedule: Schedule read from the battery at the start of this update
+            
+        Returns:
+            True if the data was written or was already in place, False if the write failed
+        """
+        if list(new_register_data) == list(current_schedule.get('raw_data') or ()):
+            logger.info("Schedule unchanged; skipping write")
+            return True
+        
+        return self.battery.write_schedule(new_register_data)
+
     def update_schedule(self) -> bool:
         """Main function to update the schedule with retries."""
         for attempt in range(MAX_RETRIES):
@@ -94,25 +112,14 @@ class ScheduleManager:
                 self.schedule_data_manager.log_schedule(new_periods, "New Periods for Tomorrow")
                 
                 # Merge and check for overlaps
-                all_periods = sorted(current_periods + new_periods, 
-                                   key=lambda x: x['start_time'])
-                final_periods = []
-                
-                for period in all_periods:
-                    overlap = False
-                    for existing in final_periods:
-                        if self.period_manager.check_overlap(period, existing):
-                            overlap = True
-                            break
-                    if not overlap:
-                        final_periods.append(period)
-                
-                # Create and write new register data
-                new_register_data = self.schedule_data_manager.create_register_data(final_periods)
+                final_periods = self.period_manager.drop_overlapping_periods(current_periods + new_periods)
+                
+                # Create and write new register data; drop_overlapping_periods returns them in start_time order
+                new_register_data = self.schedule_data_manager.create_register_data(final_periods, assume_sorted=True)
                 self.schedule_data_manager.log_schedule(final_periods, "Final Schedule")
                 
                 # Write to battery
-                success = self.battery.write_schedule(new_register_data)
+                success = self._write_schedule_if_changed(new_register_data, current_schedule)
                 if success:
                     logger.info("Successfully updated battery schedule")
                     return True
@@ -178,11 +185,12 @@ class ScheduleManager:
                 
                 # Calculate evening price information for only today
                 # We only care about today's evening periods when deciding what to add
-                now_day_bit = 1 << ((now.weekday() + 1) % 7)  # Sunday=0 convention
+                now_day_bit = get_day_bit(now)
                 today_periods = [p for p in current_periods if p['days'] & now_day_bit]
-                evening_prices, evening_hours_covered = self.optimization_manager.calculate_evening_coverage(
-                    today_periods, prices['today']
+                evening_prices, evening_coverage = self.optimization_manager.calculate_evening_coverage_mask(
+                    today_periods, prices['today'], now
                 )
+                evening_hours_covered = bin(evening_coverage).count('1')
                 
                 if evening_hours_covered >= (EVENING_END_HOUR - EVENING_START_HOUR):
                     logger.info(f"Evening period already fully covered by existing periods: {evening_hours_covered} hours")
@@ -212,32 +220,23 @@ class ScheduleManager:
                 
                 # Create new evening periods (only for today)
                 new_periods = self.period_manager.create_evening_periods(
-                    now, hours_to_add, today_periods, evening_prices, evening_hours_covered
+                    now, hours_to_add, today_periods, evening_prices, evening_hours_covered,
+                    coverage_mask=evening_coverage
                 )
                 
                 if not new_periods:
                     logger.info("No new periods created for evening optimization")
                     return True  # Not an error, just no action needed
                 
-                # Merge with existing periods
-                all_periods = sorted(current_periods + new_periods, key=lambda x: x['start_time'])
-                final_periods = []
-                
-                for period in all_periods:
-                    overlap = False
-                    for existing in final_periods:
-                        if self.period_manager.check_overlap(period, existing):
-                            overlap = True
-                            break
-                    if not overlap:
-                        final_periods.append(period)
-                
-                # Create and write new register data
-                new_register_data = self.schedule_data_manager.create_register_data(final_periods)
+                # Merge with existing periods, dropping any that overlap
+                final_periods = self.period_manager.drop_overlapping_periods(current_periods + new_periods)
+                
+                # Create and write new register data; drop_overlapping_periods returns them in start_time order
+                new_register_data = self.schedule_data_manager.create_register_data(final_periods, assume_sorted=True)
                 self.schedule_data_manager.log_schedule(final_periods, "Final Schedule")
                 
                 # Write to battery
-                success = self.battery.write_schedule(new_register_data)
+                success = self._write_schedule_if_changed(new_register_data, current_schedule)
                 if success:
                     logger.info("Successfully updated evening schedule")
                     return True
@@ -5,15 +5,18 @@ from datetime import datetime
 from config import logger, BATTERY_HOST, STOCKHOLM_TZ
 from schedule_manager import ScheduleManager
 
-def main():
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Update battery schedule with optimization')
-    parser.add_argument('--mode', choices=['regular', 'evening'], default='regular',
-                        help='Operation mode: regular (14:00) or evening (17:00)')
-    args = parser.parse_args()
+def run(mode: str) -> int:
+    """
+    Run one schedule update in the given mode.
     
+    Args:
+        mode: 'regular' (14:00) or 'evening' (17:00)
+        
+    Returns:
+        int: Exit code, 0 on success and 1 on failure
+    """
     # Log the mode we're running in
-    logger.info(f"Running battery schedule update in {args.mode} mode")
+    logger.info(f"Running battery schedule update in {mode} mode")
     
     try:
         scheduler = ScheduleManager(BATTERY_HOST)
@@ -23,20 +26,31 @@ def main():
         logger.info(f"Starting schedule update at {now.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Execute the appropriate update function based on mode
-        if args.mode == 'regular':
+        if mode == 'regular':
             success = scheduler.update_schedule()
         else:  # evening mode
             success = scheduler.update_evening_schedule()
         
         if success:
-            logger.info(f"{args.mode.capitalize()} schedule update completed successfully")
+            logger.info(f"{mode.capitalize()} schedule update completed successfully")
         else:
-            logger.error(f"{args.mode.capitalize()} schedule update failed")
-            sys.exit(1)
+            logger.error(f"{mode.capitalize()} schedule update failed")
+            return 1
             
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
-        sys.exit(1)
+        return 1
+    
+    return 0
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Update battery schedule with optimization')
+    parser.add_argument('--mode', choices=['regular', 'evening'], default='regular',
+                        help='Operation mode: regular (14:00) or evening (17:00)')
+    args = parser.parse_args()
+    
+    sys.exit(run(args.mode))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()